@@ -1,12 +1,19 @@
+import time
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 from collections import Counter
+import dataset_cache
+import dataset_query
 import dataset_utils
 import data_utils
+import interaction_store
 import openai_utils
+import suggestion_service
 import user_auth
-from ml_model import predict_depression
+from ml_model import predict_depression, predict_depression_batch
+
+SUGGESTION_POLL_INTERVAL = 0.1
 
 def display_metrics():
     st.header("Key Metrics")
@@ -24,8 +31,27 @@ def display_metrics():
     with col4:
         st.metric("Patient Satisfaction", "4.8/5", delta="0.2")
 
+def get_upload_digest(uploaded_file):
+    """
+    Content hash of the upload, computed once per upload rather than on every rerun.
+    """
+    cached = st.session_state.get("upload_digest")
+    if cached is None or cached[0] != uploaded_file.file_id:
+        cached = (uploaded_file.file_id, dataset_utils.file_digest(uploaded_file))
+        st.session_state["upload_digest"] = cached
+    return cached[1]
+
+def get_retrieval_index(digest, df, text_column, selection):
+    """
+    FAISS index over `text_column` of the (possibly searched) dataset, shared across
+    sessions and rebuilt only when the file, column or search change.
+    """
+    with st.spinner("Indexing dataset for retrieval..."):
+        return dataset_cache.retrieval_index(digest, df, text_column, selection)
+
 def combined_dashboard_page():
     display_metrics()
+    retrieval = None
     
     col1, col2 = st.columns([2, 1])
     
@@ -35,24 +61,68 @@ def combined_dashboard_page():
                                          type=["csv", "xlsx"])
         if uploaded_file is not None:
             try:
-                df = dataset_utils.load_dataset(uploaded_file)
+                digest, df = dataset_cache.load(uploaded_file, get_upload_digest(uploaded_file))
                 st.success("File uploaded successfully!")
+                load_stats = df.attrs.get("load_stats")
+                if load_stats:
+                    cache_stats = dataset_cache.get_dataset_cache().stats()
+                    st.caption(f"Parsed {load_stats['rows']:,} rows in {load_stats['parse_seconds']:.2f}s "
+                               f"({load_stats['memory_bytes'] / 1e6:.1f} MB in memory). Dataset cache: "
+                               f"{cache_stats['entries']} entries, {cache_stats['bytes_used'] / 1e6:.0f} of "
+                               f"{cache_stats['max_bytes'] / 1e6:.0f} MB, {cache_stats['evictions']} evictions")
                 
                 st.subheader("Quick Search")
-                search_query = st.text_input("Enter search query:")
+                search_query = st.text_input(
+                    "Enter search query:",
+                    help="Search the selected column, or query several columns at once, e.g. "
+                         "Age>40 AND Severity=Severe AND Symptoms~insomnia "
+                         "(operators: = != > >= < <= and ~ for contains)")
                 search_column = st.selectbox("Select column to search:",
                                              df.columns)
                 
-                
+                filtered_df = df
                 if search_query:
-                    filtered_df = dataset_utils.search_dataset(df, search_query, search_column)
-                else:
-                    filtered_df = df
+                    try:
+                        predicates = dataset_query.parse_query(search_query, df)
+                    except ValueError as e:
+                        st.error(f"Invalid query: {str(e)}")
+                    else:
+                        if predicates is None:
+                            filtered_df = dataset_cache.search(digest, df, search_query, search_column)
+                        else:
+                            filtered_df, plan = dataset_cache.query(digest, df, predicates, search_query)
+                            st.caption("Plan: " + " → ".join(
+                                f"{step['predicate']} ({step['method']}, {step['rows']:,} rows)" for step in plan))
                 
                 st.dataframe(filtered_df, use_container_width=True)
                 
+                if st.checkbox("Score uploaded dataset for depression risk"):
+                    required = ['Age', 'Duration(weeks)', 'Severity']
+                    missing = [col for col in required if col not in filtered_df.columns]
+                    if missing:
+                        st.warning(f"Scoring needs the columns: {', '.join(missing)}")
+                    else:
+                        predictions, probabilities = predict_depression_batch(filtered_df[required])
+                        scored_df = filtered_df.assign(**{
+                            "Depression Prediction": predictions,
+                            "Depression Probability": probabilities.round(2),
+                        })
+                        scored = int(pd.notna(probabilities).sum())
+                        st.metric("Patients at risk", f"{int((predictions == 1).sum())} of {scored}")
+                        if scored < len(scored_df):
+                            st.caption(f"{len(scored_df) - scored} rows missing Age, Duration(weeks) or Severity were not scored")
+                        st.dataframe(scored_df, use_container_width=True)
+                
                 
                 use_searched_data = st.checkbox("Use searched data in chatbot knowledge base")
+                if use_searched_data:
+                    text_columns = filtered_df.select_dtypes(include=['object', 'string', 'category']).columns.tolist()
+                    if not text_columns:
+                        st.warning("The dataset has no text column to retrieve from.")
+                    else:
+                        retrieval_column = st.selectbox("Text column for semantic retrieval:", text_columns)
+                        selection = (search_column, search_query) if search_query else None
+                        retrieval = get_retrieval_index(digest, filtered_df, retrieval_column, selection)
                 
             except Exception as e:
                 st.error(f"An error occurred while processing the file: {str(e)}")
@@ -85,25 +155,75 @@ def combined_dashboard_page():
     
     if submitted:
         if challenge:
-            with st.spinner("Generating suggestions..."):
-                try:
-                    context = filtered_df.to_dict('records') if use_searched_data else None
-                    suggestions = openai_utils.get_suggestions(challenge, context)
-                    st.success("Suggestions generated successfully!")
-                    for i, suggestion in enumerate(suggestions, 1):
-                        st.markdown(f"**{i}.** {suggestion}")
-                    
-                    data_utils.save_interaction(challenge, suggestions, st.session_state["user"])
-                except Exception as e:
-                    st.error(f"An error occurred: {str(e)}")
+            try:
+                context = None
+                if retrieval is not None:
+                    context, timings = openai_utils.retrieve_context(challenge, *retrieval)
+                    st.caption(f"Retrieved {len(context)} relevant rows "
+                               f"(embedding {timings['embedding_ms']:.0f} ms, search {timings['search_ms']:.0f} ms)")
+                service = suggestion_service.get_suggestion_service()
+                if service is None:
+                    st.error("OpenAI API key is not set. Please set the OPENAI_API_KEY environment variable.")
+                else:
+                    st.session_state["pending_suggestions"] = (challenge, service.submit_stream(challenge, context))
+            except Exception as e:
+                st.error(f"An error occurred: {str(e)}")
         else:
             st.warning("Please enter a challenge before requesting suggestions.")
+    
+    if "pending_suggestions" in st.session_state:
+        show_pending_suggestions(*st.session_state["pending_suggestions"])
+
+def render_suggestions(placeholder, suggestions):
+    with placeholder.container():
+        for i, suggestion in enumerate(suggestions, 1):
+            st.markdown(f"**{i}.** {suggestion}")
+
+def show_pending_suggestions(challenge, stream):
+    """
+    Render suggestions as the service streams them in, then save the final list.
+
+    The request runs on the service's own loop, so a rerun triggered by other widgets
+    interrupts only this polling loop; the next run picks the same request back up.
+    """
+    status = st.empty()
+    placeholder = st.empty()
+    shown = 0
+    while not stream.future.done():
+        if len(stream.suggestions) != shown:
+            shown = len(stream.suggestions)
+            render_suggestions(placeholder, list(stream.suggestions))
+        status.info(f"Generating suggestions... {time.perf_counter() - stream.started_at:.0f}s")
+        time.sleep(SUGGESTION_POLL_INTERVAL)
+    status.empty()
+    del st.session_state["pending_suggestions"]
+    
+    try:
+        suggestions = stream.future.result()
+        st.success("Suggestions generated successfully!")
+        render_suggestions(placeholder, suggestions)
+        if stream.time_to_first_suggestion is not None:
+            st.caption(f"First suggestion after {stream.time_to_first_suggestion:.1f}s")
+        
+        data_utils.save_interaction(challenge, suggestions, st.session_state["user"])
+    except Exception as e:
+        st.error(f"An error occurred: {str(e)}")
 
 def view_history_page():
-    history = data_utils.get_interaction_history(st.session_state["user"])
+    # Stack of keyset cursors: each entry is the `before_id` of a page we paged into.
+    cursors = st.session_state.setdefault("history_cursors", [])
+    before_id = cursors[-1] if cursors else None
+    history = data_utils.get_interaction_history(st.session_state["user"], before_id=before_id)
+    if not history and cursors:
+        cursors.clear()
+        st.rerun()
     if not history:
         st.info("No interaction history available. Start by adding some challenges!")
     else:
+        total = data_utils.get_interaction_count(st.session_state["user"])
+        first = len(cursors) * interaction_store.HISTORY_PAGE_SIZE + 1
+        st.caption(f"Showing {first}-{first + len(history) - 1} of {total} interactions (newest first)")
+        
         for entry in history:
             with st.expander(f"Challenge from {entry['timestamp']}"):
                 st.write("**Challenge:**", entry['challenge'])
@@ -123,14 +243,24 @@ def view_history_page():
                     f"Rate the suggestions (1-5):",
                     options=["1", "2", "3", "4", "5"],
                     value=feedback_value,
-                    key=f"feedback_{entry['timestamp']}"
+                    key=f"feedback_{entry['id']}"
                 )
                 
-                if st.button("Submit Feedback", key=f"submit_{entry['timestamp']}"):
-                    data_utils.save_feedback(entry['timestamp'], feedback)
+                if st.button("Submit Feedback", key=f"submit_{entry['id']}"):
+                    data_utils.save_feedback(entry['id'], feedback)
                     st.success("Feedback submitted successfully!")
                     st.rerun()
         
+        col1, col2 = st.columns(2)
+        with col1:
+            if cursors and st.button("Newer"):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            if first + len(history) - 1 < total and st.button("Older"):
+                cursors.append(history[-1]['id'])
+                st.rerun()
+        
         st.subheader("Interaction Summary")
         df = pd.DataFrame(history)
         df['suggestions'] = df['suggestions'].apply(lambda x: ', '.join(x) if isinstance(x, list) else x)
@@ -157,23 +287,21 @@ def feedback_stats_page():
             st.progress(avg_rating / 5)
             st.write(f"{avg_rating:.2f} out of 5")
             
-            df = pd.read_csv("interaction_history.csv")
-            feedback_counts = df['feedback'].value_counts().sort_index()
+            feedback_counts = stats['rating_histogram']
             
-            if not feedback_counts.empty:
+            if feedback_counts:
                 st.subheader("Feedback Distribution")
-                fig = px.bar(x=feedback_counts.index, y=feedback_counts.values, 
+                fig = px.bar(x=list(feedback_counts.keys()), y=list(feedback_counts.values()), 
                              labels={'x': 'Rating', 'y': 'Count'},
                              title='Distribution of Feedback Ratings')
                 st.plotly_chart(fig, use_container_width=True)
                 
                 st.subheader("Feedback Over Time")
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                df['feedback'] = pd.to_numeric(df['feedback'], errors='coerce')
-                df_valid = df.dropna(subset=['feedback'])
-                fig_time = px.scatter(df_valid, x='timestamp', y='feedback', 
-                                      title='Feedback Ratings Over Time',
-                                      labels={'timestamp': 'Date', 'feedback': 'Rating'})
+                df_daily = pd.DataFrame(stats['daily_ratings'])
+                df_daily['day'] = pd.to_datetime(df_daily['day'])
+                fig_time = px.scatter(df_daily, x='day', y='average_rating', 
+                                      title='Average Feedback Rating per Day',
+                                      labels={'day': 'Date', 'average_rating': 'Rating'})
                 fig_time.update_traces(mode='lines+markers')
                 st.plotly_chart(fig_time, use_container_width=True)
             else:
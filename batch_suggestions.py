@@ -0,0 +1,170 @@
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import interaction_store
+import suggestion_service
+
+BATCH_CONCURRENCY = 4
+# Client-side pacing so a large backlog stays under the account's request quota; 0 disables it.
+BATCH_REQUESTS_PER_MINUTE = 60
+
+
+def load_challenges(path, column=None):
+    """
+    Read challenges from a CSV or XLSX column, or one per line from any other file.
+
+    Without `column`, a column named 'challenge' is used, or the only column of the file.
+    """
+    if path.endswith((".csv", ".xlsx")):
+        df = pd.read_csv(path) if path.endswith(".csv") else pd.read_excel(path)
+        if column is None:
+            if "challenge" in df.columns:
+                column = "challenge"
+            elif len(df.columns) == 1:
+                column = df.columns[0]
+            else:
+                raise ValueError(f"{path} has several columns; choose one of: {', '.join(map(str, df.columns))}")
+        challenges = df[column].fillna("").astype(str).tolist()
+    else:
+        with open(path, encoding="utf-8") as f:
+            challenges = f.read().splitlines()
+    return [challenge.strip() for challenge in challenges]
+
+
+def challenge_hash(challenge):
+    return hashlib.sha256(challenge.encode("utf-8")).hexdigest()
+
+
+def read_checkpoint(checkpoint_path):
+    """
+    Return {challenge hash: (timestamp, suggestions)} for the challenges a previous run finished.
+
+    Entries are keyed by the challenge text rather than its row, so an input file
+    edited between runs never has old suggestions attached to other challenges.
+    """
+    done = {}
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A run killed mid-write leaves a torn last line.
+                if "challenge_sha256" in entry:
+                    done[entry["challenge_sha256"]] = (entry["timestamp"], entry["suggestions"])
+    return done
+
+
+def run_batch(path, user, column=None, checkpoint_path=None, max_concurrency=BATCH_CONCURRENCY,
+              requests_per_minute=BATCH_REQUESTS_PER_MINUTE, skip_failed=False, service=None):
+    """
+    Generate suggestions for every challenge in `path` and record them as `user`'s interactions.
+
+    At most `max_concurrency` challenges are in flight, and new requests are
+    paced to `requests_per_minute`. Every finished row is appended to a JSONL
+    checkpoint (default: `<path>.checkpoint.jsonl`), so rerunning after a crash
+    only requests the rows that are missing. Once every row has suggestions (or
+    with `skip_failed`, whatever succeeded), the results are written to the
+    interaction store in one transaction. Each row is marked as written by its
+    challenge's hash and its occurrence among identical challenges, so a rerun
+    never writes a row twice, even after the input was edited, and a rerun
+    after `skip_failed` adds the rows that failed before. Returns a summary dict.
+    """
+    if service is None:
+        service = suggestion_service.get_suggestion_service()
+        if service is None:
+            raise Exception("OpenAI API key is not set. Please set the OPENAI_API_KEY environment variable.")
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint.jsonl"
+
+    challenges = load_challenges(path, column)
+    hashes = [challenge_hash(challenge) for challenge in challenges]
+    finished = read_checkpoint(checkpoint_path)
+    done = {row: finished[sha] for row, sha in enumerate(hashes) if sha in finished}
+    remaining = [row for row, challenge in enumerate(challenges) if challenge and row not in done]
+    print(f"{len(challenges)} challenges, {len(done)} already done, {len(remaining)} to request")
+
+    failed = {}
+    interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+    next_slot = time.monotonic()
+    start = time.perf_counter()
+    pending = {}
+    todo = iter(remaining)
+    with open(checkpoint_path, "a+", encoding="utf-8") as checkpoint:
+        if checkpoint.tell() > 0:
+            checkpoint.seek(checkpoint.tell() - 1)
+            if checkpoint.read(1) != "\n":
+                checkpoint.write("\n")  # Start after the torn line of a killed run.
+        while True:
+            while len(pending) < max_concurrency:
+                row = next(todo, None)
+                if row is None:
+                    break
+                wait = next_slot - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                next_slot = max(next_slot, time.monotonic()) + interval
+                pending[service.submit(challenges[row])] = row
+            if not pending:
+                break
+            finished, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                row = pending.pop(future)
+                try:
+                    suggestions = future.result()
+                except Exception as e:
+                    failed[row] = str(e)
+                    print(f"Row {row} failed: {str(e)}")
+                    continue
+                timestamp = datetime.now().isoformat()
+                done[row] = (timestamp, suggestions)
+                checkpoint.write(json.dumps({"row": row, "challenge_sha256": hashes[row], "timestamp": timestamp,
+                                             "suggestions": suggestions}) + "\n")
+                checkpoint.flush()
+            print(f"{len(done)}/{len(challenges)} done, {len(failed)} failed")
+
+    summary = {
+        "challenges": len(challenges),
+        "completed": len(done),
+        "failed": len(failed),
+        "written": 0,
+        "elapsed_s": time.perf_counter() - start,
+    }
+    if failed and not skip_failed:
+        print(f"{len(failed)} rows failed; rerun to retry them. Nothing was written to the interaction store yet.")
+        return summary
+
+    occurrences, seen = [], {}
+    for sha in hashes:
+        occurrences.append(seen.get(sha, 0))
+        seen[sha] = occurrences[-1] + 1
+    written = sorted(done.items())
+    rows = [(timestamp, user, challenges[row], suggestions, None) for row, (timestamp, suggestions) in written]
+    row_markers = [f"batch:{user}:{hashes[row]}:{occurrences[row]}" for row, _ in written]
+    summary["written"] = interaction_store.get_store().append_many(rows, row_markers=row_markers)
+    if summary["written"] == 0 and rows:
+        print("This batch was already written to the interaction store.")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate AI suggestions for a file of patient challenges")
+    parser.add_argument("path", help="CSV/XLSX file with a challenge column, or a text file with one challenge per line")
+    parser.add_argument("--user", required=True, help="user the interactions are recorded for")
+    parser.add_argument("--column", help="column holding the challenges")
+    parser.add_argument("--checkpoint", help="progress file (default: <path>.checkpoint.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--requests-per-minute", type=float, default=BATCH_REQUESTS_PER_MINUTE)
+    parser.add_argument("--skip-failed", action="store_true", help="write the successful rows even if some failed")
+    args = parser.parse_args()
+
+    summary = run_batch(args.path, args.user, args.column, args.checkpoint, args.concurrency,
+                        args.requests_per_minute, args.skip_failed)
+    print(f"Done in {summary['elapsed_s']:.1f}s: {summary['completed']} of {summary['challenges']} completed, "
+          f"{summary['failed']} failed, {summary['written']} written to {interaction_store.HISTORY_DB}")
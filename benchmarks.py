@@ -0,0 +1,581 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import interaction_store
+
+
+def _hammer_store(db_path, worker, threads, writes):
+    store = interaction_store.InteractionStore(db_path)
+
+    def run(thread):
+        for i in range(writes):
+            user = f"counselor-{worker}-{thread}"
+            interaction_id = store.append_async(f"{worker}-{thread}-{i}", user, f"challenge {i}", ["a", "b"])
+            if i % 10 == 0:
+                store.set_feedback_async(interaction_id.result(), str(i % 5 + 1))
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    store.close()
+
+
+def stress_store(args):
+    """
+    Hammer one interaction database from many processes and threads, then check nothing was lost.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "stress.db")
+        interaction_store.InteractionStore(db_path).close()
+
+        start = time.perf_counter()
+        procs = [
+            multiprocessing.Process(target=_hammer_store, args=(db_path, w, args.threads, args.writes))
+            for w in range(args.processes)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        store = interaction_store.InteractionStore(db_path)
+        stats = store.feedback_stats()
+        expected = args.processes * args.threads * args.writes
+        expected_feedback = args.processes * args.threads * len(range(0, args.writes, 10))
+        print(f"{expected} writes from {args.processes} processes x {args.threads} threads in {elapsed:.2f}s "
+              f"({expected / elapsed:.0f} writes/s)")
+        print(f"Stored interactions: {stats['total_interactions']} (expected {expected})")
+        print(f"Stored feedback: {stats['feedback_given']} (expected {expected_feedback})")
+        store.close()
+        if stats["total_interactions"] != expected or stats["feedback_given"] != expected_feedback:
+            raise SystemExit("Lost writes detected")
+
+
+def _timed_subprocess(code, cwd):
+    """
+    Run `code` in a fresh interpreter; return (wall time, last float it printed).
+    """
+    start = time.perf_counter()
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, check=True,
+                            capture_output=True, text=True)
+    return time.perf_counter() - start, float(result.stdout.split()[-1])
+
+
+def model_startup(args):
+    """
+    Compare a cold start that has to train the depression model with one that loads the saved artifact.
+    """
+    import ml_model
+
+    code = ("import time, ml_model; start = time.perf_counter(); "
+            "ml_model.predict_depression(35, 12, 'Moderate'); print(time.perf_counter() - start)")
+    runs = {"without artifact (train)": [], "with artifact (load)": []}
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            shutil.copy(ml_model.DATASET_FILE, tmp)
+            for label in runs:
+                runs[label].append(_timed_subprocess(code, tmp))
+    for label, timings in runs.items():
+        total = sum(t for t, _ in timings) / len(timings)
+        model = sum(m for _, m in timings) / len(timings)
+        print(f"Startup {label}: process {total:.2f}s, first prediction ready after {model * 1000:.0f}ms")
+
+
+def _legacy_predict_depression(artifact, age, duration, severity):
+    # The DataFrame/get_dummies/StandardScaler path predict_depression used to take.
+    import pandas as pd
+
+    feature_columns = artifact["feature_columns"]
+    input_data = pd.DataFrame([[age, duration, severity]], columns=['Age', 'Duration(weeks)', 'Severity'])
+    input_data = pd.get_dummies(input_data, columns=['Severity'])
+    for col in feature_columns:
+        if col not in input_data.columns:
+            input_data[col] = 0
+    input_scaled = artifact["scaler"].transform(input_data[feature_columns])
+    prediction = artifact["model"].predict(input_scaled)
+    probability = artifact["model"].predict_proba(input_scaled)[0][1]
+    return prediction[0], probability
+
+
+def _latency_report(label, timings):
+    timings = sorted(timings)
+    p50 = timings[len(timings) // 2]
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{label}: p50 {p50 * 1e6:.0f}us, p99 {p99 * 1e6:.0f}us over {len(timings)} calls")
+
+
+def predict_latency(args):
+    """
+    Single-patient prediction latency: compiled fast path vs the old pandas path.
+    """
+    import random
+
+    import ml_model
+
+    artifact = ml_model.load_model()
+    rng = random.Random(0)
+    inputs = [(rng.randint(18, 100), rng.randint(1, 52), rng.choice(["Mild", "Moderate", "Severe"]))
+              for _ in range(args.calls)]
+
+    for label, predict in [
+        ("pandas path", lambda *x: _legacy_predict_depression(artifact, *x)),
+        ("fast path", ml_model.predict_depression),
+    ]:
+        predict(*inputs[0])
+        timings = []
+        for patient in inputs:
+            start = time.perf_counter()
+            predict(*patient)
+            timings.append(time.perf_counter() - start)
+        _latency_report(label, timings)
+
+
+def embedding_latency(args):
+    """
+    Semantic-search query latency when the model is reloaded per call vs taken from the registry.
+    """
+    import numpy as np
+    import pandas as pd
+    from sentence_transformers import SentenceTransformer
+
+    import dataset_utils
+
+    texts = [f"Patient reports insomnia and low mood, case {i}" for i in range(args.rows)]
+    index, metadata = dataset_utils.index_dataframe(pd.DataFrame({"text": texts}), "text")
+    queries = ["trouble sleeping", "persistent sadness", "anxiety at work"]
+
+    def reload_per_call(query):
+        model = SentenceTransformer(dataset_utils.EMBEDDING_MODEL_NAME)
+        embedding = model.encode([query])
+        index.search(np.asarray(embedding, dtype='float32'), 5)
+
+    def registry(query):
+        dataset_utils.search_similar_texts(query, index, metadata)
+
+    for label, search in [("reload per call", reload_per_call), ("shared registry", registry)]:
+        timings = []
+        for i in range(args.queries):
+            start = time.perf_counter()
+            search(queries[i % len(queries)])
+            timings.append(time.perf_counter() - start)
+        _latency_report(label, timings)
+
+
+def _recall_at_k(found, expected):
+    hits = sum(len(set(f[f != -1]) & set(e)) for f, e in zip(found, expected))
+    return hits / expected.size
+
+
+def ann_eval(args):
+    """
+    Recall@k and per-query latency of each approximate index against the exact flat index.
+    """
+    import numpy as np
+    import pandas as pd
+
+    import dataset_utils
+
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        embeddings = rng.standard_normal((args.synthetic, 384)).astype('float32')
+    else:
+        texts = pd.read_csv(args.dataset)[args.text_column].fillna('').astype(str).tolist()
+        embeddings = np.asarray(dataset_utils.generate_embeddings(texts), dtype='float32')
+    rng = np.random.default_rng(1)
+    queries = embeddings[rng.choice(len(embeddings), min(args.queries, len(embeddings)), replace=False)]
+    queries = queries + rng.normal(0, 0.01, queries.shape).astype('float32')
+
+    flat = dataset_utils.create_faiss_index(embeddings)
+    _, expected = flat.search(queries, args.k)
+
+    configs = [("flat", {}, {})]
+    for nprobe in args.nprobe:
+        configs.append(("ivf_flat", {}, {"nprobe": nprobe}))
+        configs.append(("ivf_pq", {"pq_m": args.pq_m}, {"nprobe": nprobe}))
+    for ef_search in args.ef_search:
+        configs.append(("hnsw", {}, {"ef_search": ef_search}))
+
+    built = {}
+    print(f"{len(embeddings)} vectors, {len(queries)} queries, k={args.k}")
+    for index_type, build_params, search_params in configs:
+        if index_type not in args.index_types:
+            continue
+        if index_type not in built:
+            start = time.perf_counter()
+            built[index_type] = dataset_utils.create_faiss_index(embeddings, index_type, **build_params)
+            print(f"built {index_type} in {time.perf_counter() - start:.2f}s")
+        index = dataset_utils.set_search_params(built[index_type], **search_params)
+        _, found = index.search(queries, args.k)
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query[None, :], args.k)
+            timings.append(time.perf_counter() - start)
+        label = f"{index_type} {search_params or ''}".strip()
+        _latency_report(f"{label:<28} recall@{args.k} {_recall_at_k(found, expected):.3f}", timings)
+
+
+def _search_index_queries(df, index, column, queries, repeat):
+    import dataset_utils
+
+    for query in queries:
+        scan = []
+        indexed = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            expected = dataset_utils.search_dataset(df, query, column)
+            scan.append(time.perf_counter() - start)
+            if index is not None:
+                start = time.perf_counter()
+                found = dataset_utils.search_dataset(df, query, column, index)
+                indexed.append(time.perf_counter() - start)
+                assert expected.index.equals(found.index), (column, query)
+        _latency_report(f"  {query!r:<16} {len(expected):>7} rows  scan ", scan)
+        if index is not None:
+            _latency_report(f"  {query!r:<16} {len(expected):>7} rows  index", indexed)
+
+
+def search_index_benchmark(args):
+    """
+    Quick Search latency: the str.contains / equality scan vs the per-column search index.
+
+    Runs on the dataset as shipped, then on a synthetic frame of `--rows` rows whose
+    Symptoms are recombined from the dataset's phrases and whose Notes are unique per row.
+    """
+    import numpy as np
+    import pandas as pd
+
+    import dataset_utils
+    import search_index
+
+    base = dataset_utils.load_dataset(args.dataset)
+    rng = np.random.default_rng(0)
+    phrases = sorted({p.strip() for s in base["Symptoms"].dropna() for p in str(s).split(",") if p.strip()})
+    picks = rng.integers(0, len(phrases), (args.rows, 4))
+    sizes = rng.integers(1, 5, args.rows)
+    symptoms = [", ".join(phrases[p] for p in row[:size]) for row, size in zip(picks, sizes)]
+    scaled = pd.DataFrame({
+        "Symptoms": pd.array(symptoms, dtype=base["Symptoms"].dtype),
+        "Notes": pd.array([f"Session {i}: patient reports {s.lower()}; review in {w} weeks"
+                           for i, (s, w) in enumerate(zip(symptoms, rng.integers(1, 26, args.rows)))],
+                          dtype=base["Symptoms"].dtype),
+        "Severity": base["Severity"].iloc[rng.integers(0, len(base), args.rows)].to_numpy(),
+        "Age": base["Age"].iloc[rng.integers(0, len(base), args.rows)].to_numpy(),
+    })
+
+    for name, df, columns in [
+        (args.dataset, base, [("Symptoms", ["insomnia", "loss of app", "fatigue, irr", "zzz"]),
+                              ("Severity", ["severe", "mild"]),
+                              ("Age", ["42", "65"])]),
+        ("synthetic", scaled, [("Symptoms", ["insomnia", "loss of app", "fatigue, irr", "zzz"]),
+                               ("Notes", ["session 4242:", "reports anx", "sion 1", "review in 12"]),
+                               ("Severity", ["severe", "mild"]),
+                               ("Age", ["42", "65"])]),
+    ]:
+        print(f"{name}: {len(df)} rows")
+        for column, queries in columns:
+            start = time.perf_counter()
+            index = search_index.build_column_index(df[column])
+            built = (time.perf_counter() - start) * 1000
+            status = f"index built in {built:.0f} ms" if index is not None else "not indexed, scan only"
+            print(f" {column} ({df[column].nunique()} distinct): {status}")
+            _search_index_queries(df, index, column, queries, args.repeat)
+
+
+def profile_benchmark(args):
+    """
+    Dataset profiling: per-column pandas reductions vs the single-pass profile, and appending rows to it.
+    """
+    import numpy as np
+    import pandas as pd
+
+    import dataset_profile
+    import dataset_utils
+
+    base = dataset_utils.load_dataset(args.dataset)
+    rng = np.random.default_rng(0)
+    df = base.iloc[rng.integers(0, len(base), args.rows)].reset_index(drop=True)
+    df["Score"] = rng.normal(50, 10, len(df))
+    df.loc[rng.random(len(df)) < 0.05, "Score"] = np.nan
+    appended = base.iloc[rng.integers(0, len(base), args.append_rows)].reset_index(drop=True)
+    appended["Score"] = rng.normal(50, 10, len(appended))
+    print(f"{len(df)} rows, {len(df.select_dtypes(include=[np.number]).columns)} numeric columns")
+
+    start = time.perf_counter()
+    expected = {}
+    for col in df.select_dtypes(include=[np.number]).columns:
+        expected[col] = {"mean": df[col].mean(), "median": df[col].median(), "std": df[col].std(),
+                         "min": df[col].min(), "max": df[col].max()}
+    print(f"per-column reductions: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    dataset_profile.profile_dataframe(df.select_dtypes(include=[np.number])).info()
+    print(f"profile, numeric columns only: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    profile = dataset_profile.profile_dataframe(df)
+    info = profile.info()
+    print(f"profile, all columns: {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"({'sampled' if info['approximate_quantiles'] else 'exact'} quantiles)")
+    for col, stats in expected.items():
+        deviation = {name: abs(info[f"{col}_stats"][name] - value) / max(abs(value), 1e-12)
+                     for name, value in stats.items()}
+        print(f"  {col:<16} " + "  ".join(f"{name} {error:.1e}" for name, error in deviation.items()))
+    print("  " + ", ".join(f"{col}: {info[f'{col}_values']['distinct']} distinct" for col in info["categorical_columns"]))
+
+    start = time.perf_counter()
+    profile.update(appended)
+    updated = profile.info()
+    print(f"append {len(appended)} rows: {(time.perf_counter() - start) * 1000:.0f} ms")
+    combined = pd.concat([df, appended], ignore_index=True)
+    start = time.perf_counter()
+    dataset_profile.profile_dataframe(combined)
+    print(f"reprofile {len(combined)} rows: {(time.perf_counter() - start) * 1000:.0f} ms")
+    assert updated["total_rows"] == len(combined)
+    assert abs(updated["Score_stats"]["mean"] - combined["Score"].mean()) < 1e-9
+    assert abs(updated["Score_stats"]["std"] - combined["Score"].std()) < 1e-9
+    assert updated["null_counts"] == combined.isna().sum().to_dict()
+
+
+class _StubOpenAI:
+    """
+    Stands in for the OpenAI client: answers after a fixed delay and counts calls.
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        import json
+        from types import SimpleNamespace
+
+        self.calls += 1
+        time.sleep(self.delay)
+        content = json.dumps({"suggestions": [f"Stub suggestion {self.calls}"]})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def suggestion_cache_hits(args):
+    """
+    Replay challenges from the interaction history against a stub client and report cache hit ratios.
+    """
+    import openai_utils
+    import suggestion_cache
+
+    challenges = [record["challenge"] for record in interaction_store.get_store().records()][:args.limit]
+    if not challenges:
+        print("No challenges in the interaction history to replay.")
+        return
+
+    embed = None
+    if args.semantic:
+        import dataset_utils
+        embed = lambda text: dataset_utils.embed_query(text)[0]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = suggestion_cache.SuggestionCache(
+            os.path.join(tmp, "cache.db"), semantic_threshold=args.threshold, embed=embed
+        )
+        client = _StubOpenAI(args.delay)
+        timings = []
+        for challenge in challenges:
+            start = time.perf_counter()
+            openai_utils.get_suggestions(challenge, openai_client=client, cache=cache)
+            timings.append(time.perf_counter() - start)
+        stats = cache.stats()
+
+    print(f"{len(challenges)} challenges, {client.calls} client calls")
+    print(f"exact hits {stats['exact_hits']}, semantic hits {stats['semantic_hits']}, "
+          f"misses {stats['misses']}, hit ratio {stats['hit_ratio']:.2%}")
+    _latency_report("get_suggestions", timings)
+
+
+def _fake_openai_server(delay, fail_first):
+    """
+    Local HTTP server speaking just enough of the chat completions API for the suggestion service.
+    """
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    state = {"requests": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                state["requests"] += 1
+                number = state["requests"]
+            time.sleep(delay)
+            if number <= fail_first:
+                status, payload = 503, {"error": {"message": "overloaded", "type": "server_error"}}
+            elif body.get("stream"):
+                self.stream_completion(body, number)
+                return
+            else:
+                content = json.dumps({"suggestions": [f"Fake suggestion {number}"]})
+                status, payload = 200, {
+                    "id": f"chatcmpl-{number}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                }
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def stream_completion(self, body, number):
+            """
+            Send the answer as server-sent events, a few characters per chunk spread over another `delay`.
+            """
+            content = json.dumps({"suggestions": [f"Fake suggestion {number}.{i}" for i in range(5)]})
+            pieces = [content[i:i + 8] for i in range(0, len(content), 8)]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for piece in pieces:
+                chunk = {
+                    "id": f"chatcmpl-{number}",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [{"index": 0, "finish_reason": None, "delta": {"content": piece}}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(delay / len(pieces))
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def suggestion_service_load(args):
+    """
+    Fire concurrent suggestion requests, with repeats, at the async service backed by a fake server.
+    """
+    import suggestion_cache
+    import suggestion_service
+
+    server, state = _fake_openai_server(args.delay, args.fail_first)
+    challenges = [f"Patient {i % args.distinct} reports trouble sleeping" for i in range(args.requests)]
+    with tempfile.TemporaryDirectory() as tmp:
+        service = suggestion_service.SuggestionService(
+            api_key="test",
+            base_url=f"http://127.0.0.1:{server.server_port}/v1",
+            max_concurrency=args.concurrency,
+            cache=suggestion_cache.SuggestionCache(os.path.join(tmp, "cache.db")),
+        )
+        start = time.perf_counter()
+        if args.stream:
+            streams = [service.submit_stream(challenge) for challenge in challenges]
+            totals = []
+            for stream in streams:
+                stream.future.result()
+                totals.append(time.perf_counter() - stream.started_at)
+            results = streams
+        else:
+            results = [future.result() for future in [service.submit(challenge) for challenge in challenges]]
+        elapsed = time.perf_counter() - start
+        service.close()
+    server.shutdown()
+
+    print(f"{len(results)} requests for {args.distinct} distinct challenges in {elapsed:.2f}s")
+    print(f"server saw {state['requests']} requests; service counters {service.counters}")
+    if args.stream:
+        _latency_report("time to first suggestion", list(service.first_suggestion_latencies))
+        _latency_report("time to full answer", totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Performance checks for the Mental Health Counselor Assistant")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stress = subparsers.add_parser("stress-store", help="concurrent writers against the interaction store")
+    stress.add_argument("--processes", type=int, default=4)
+    stress.add_argument("--threads", type=int, default=16)
+    stress.add_argument("--writes", type=int, default=200)
+    stress.set_defaults(func=stress_store)
+
+    startup = subparsers.add_parser("model-startup", help="process start time with and without a saved model")
+    startup.add_argument("--repeat", type=int, default=3)
+    startup.set_defaults(func=model_startup)
+
+    latency = subparsers.add_parser("predict-latency", help="single-row depression prediction latency")
+    latency.add_argument("--calls", type=int, default=500)
+    latency.set_defaults(func=predict_latency)
+
+    embedding = subparsers.add_parser("embedding-latency", help="semantic search latency with and without the model registry")
+    embedding.add_argument("--rows", type=int, default=1000)
+    embedding.add_argument("--queries", type=int, default=20)
+    embedding.set_defaults(func=embedding_latency)
+
+    ann = subparsers.add_parser("ann-eval", help="recall vs latency of FAISS index types against the flat baseline")
+    ann.add_argument("--dataset", default="mental_health_dataset.csv")
+    ann.add_argument("--text-column", default="Symptoms")
+    ann.add_argument("--synthetic", type=int, default=0, help="use N random vectors instead of embedding the dataset")
+    ann.add_argument("--index-types", nargs="+", default=["flat", "ivf_flat", "ivf_pq", "hnsw"])
+    ann.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    ann.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    ann.add_argument("--pq-m", type=int, default=8)
+    ann.add_argument("--queries", type=int, default=200)
+    ann.add_argument("--k", type=int, default=10)
+    ann.set_defaults(func=ann_eval)
+
+    search = subparsers.add_parser("search-index", help="Quick Search scan vs inverted/sorted column index")
+    search.add_argument("--dataset", default="mental_health_dataset.csv")
+    search.add_argument("--rows", type=int, default=1_000_000)
+    search.add_argument("--repeat", type=int, default=5)
+    search.set_defaults(func=search_index_benchmark)
+
+    profile = subparsers.add_parser("profile", help="per-column statistics vs the single-pass dataset profile")
+    profile.add_argument("--dataset", default="mental_health_dataset.csv")
+    profile.add_argument("--rows", type=int, default=10_000_000)
+    profile.add_argument("--append-rows", type=int, default=100_000)
+    profile.set_defaults(func=profile_benchmark)
+
+    cache = subparsers.add_parser("suggestion-cache", help="suggestion cache hit ratio over the interaction history")
+    cache.add_argument("--limit", type=int, default=1000)
+    cache.add_argument("--delay", type=float, default=0.5, help="simulated model latency in seconds")
+    cache.add_argument("--threshold", type=float, default=0.92)
+    cache.add_argument("--semantic", action="store_true", help="enable the embedding tier")
+    cache.set_defaults(func=suggestion_cache_hits)
+
+    service = subparsers.add_parser("suggestion-service", help="async suggestion service against a local fake server")
+    service.add_argument("--requests", type=int, default=200)
+    service.add_argument("--distinct", type=int, default=20)
+    service.add_argument("--concurrency", type=int, default=8)
+    service.add_argument("--delay", type=float, default=0.2, help="fake server latency in seconds")
+    service.add_argument("--fail-first", type=int, default=2, help="answer the first N requests with a 503")
+    service.add_argument("--stream", action="store_true", help="stream responses and report time to first suggestion")
+    service.set_defaults(func=suggestion_service_load)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
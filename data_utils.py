@@ -1,91 +1,79 @@
-import pandas as pd
 from datetime import datetime
 
-HISTORY_FILE = "interaction_history.csv"
+import interaction_store
+
+
+def _report_write_error(future):
+    if future.exception() is not None:
+        print(f"Error writing interaction history: {str(future.exception())}")
 
 def save_interaction(challenge: str, suggestions: list, user: str):
     """
-    Save the interaction (challenge and suggestions) to the history file.
+    Queue the interaction (challenge and suggestions) for the history writer.
+
+    Returns a Future for the new interaction's id; the write is committed in the
+    background so the caller does not wait on disk.
     """
-    try:
-        df = pd.read_csv(HISTORY_FILE)
-    except FileNotFoundError:
-        df = pd.DataFrame(columns=["timestamp", "user", "challenge", "suggestions", "feedback"])
-    
-    new_row = {
-        "timestamp": datetime.now().isoformat(),
-        "user": user,
-        "challenge": challenge,
-        "suggestions": "|".join(suggestions),
-        "feedback": ""  
-    }
-    df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-    df.to_csv(HISTORY_FILE, index=False)
+    future = interaction_store.get_store().append_async(datetime.now().isoformat(), user, challenge, suggestions)
+    future.add_done_callback(_report_write_error)
+    return future
 
-def get_interaction_history(current_user: str):
+def get_interaction_history(current_user: str, page_size: int = interaction_store.HISTORY_PAGE_SIZE,
+                            before_id: int = None):
     """
-    Retrieve the interaction history from the CSV file for the current user.
+    Retrieve one page of the current user's interaction history, newest first.
+
+    Pass the smallest id of the previous page as `before_id` to fetch the next older page.
     """
     try:
-        df = pd.read_csv(HISTORY_FILE)
-        if df.empty:
-            return []
-        
-      
-        if 'user' not in df.columns:
-            df['user'] = 'Unknown'
-        else:
-            df['user'] = df['user'].fillna('Unknown')
-        
-        
-        user_df = df[df['user'] == current_user]
-        
-        if user_df.empty:
-            return []
-        
-        user_df["suggestions"] = user_df["suggestions"].apply(lambda x: x.split("|") if isinstance(x, str) else [])
-        return user_df.to_dict("records")
-    except FileNotFoundError:
-        return []
+        return interaction_store.get_store().history(current_user, page_size, before_id)
     except Exception as e:
         print(f"Error reading interaction history: {str(e)}")
         return []
 
-def save_feedback(timestamp: str, feedback: str):
+def get_interaction_count(current_user: str):
+    """
+    Count the interactions recorded for the current user.
+    """
+    try:
+        return interaction_store.get_store().history_count(current_user)
+    except Exception as e:
+        print(f"Error reading interaction history: {str(e)}")
+        return 0
+
+def save_feedback(interaction_id: int, feedback: str):
     """
-    Save user feedback for a specific interaction.
+    Queue user feedback for the interaction with the given id.
     """
     try:
-        df = pd.read_csv(HISTORY_FILE)
-        df.loc[df['timestamp'] == timestamp, 'feedback'] = feedback
-        df.to_csv(HISTORY_FILE, index=False)
+        future = interaction_store.get_store().set_feedback_async(interaction_id, feedback)
     except Exception as e:
         raise Exception(f"Error saving feedback: {str(e)}")
+    future.add_done_callback(_report_write_error)
+    return future
+
+def get_recent_rated_interactions(n: int = interaction_store.RECENT_RATED_SIZE):
+    """
+    Retrieve the `n` newest interactions that have received a rating, newest first.
+    """
+    try:
+        return interaction_store.get_store().recent_rated(n)
+    except Exception as e:
+        print(f"Error reading interaction history: {str(e)}")
+        return []
+
+def get_feedback_version():
+    """
+    Counter that changes whenever the recent rated interactions change, in any process,
+    for caches derived from them.
+    """
+    return interaction_store.get_store().feedback_version
 
 def get_feedback_stats():
     """
     Get statistics on user feedback.
     """
     try:
-        df = pd.read_csv(HISTORY_FILE)
-        total_interactions = len(df)
-        feedback_given = df['feedback'].notna().sum()
-        
-        if feedback_given > 0:
-            average_rating = df['feedback'].astype(float).mean()
-        else:
-            average_rating = None
-        
-        return {
-            "total_interactions": total_interactions,
-            "feedback_given": feedback_given,
-            "average_rating": average_rating
-        }
-    except FileNotFoundError:
-        return {
-            "total_interactions": 0,
-            "feedback_given": 0,
-            "average_rating": None
-        }
+        return interaction_store.get_store().feedback_stats()
     except Exception as e:
         raise Exception(f"Error getting feedback stats: {str(e)}")
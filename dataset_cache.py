@@ -0,0 +1,160 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+import pandas as pd
+
+import dataset_query
+import dataset_utils
+import search_index
+
+# Memory the cached datasets and their derived artifacts may take, across all sessions.
+DATASET_CACHE_MAX_BYTES = int(os.environ.get("DATASET_CACHE_MAX_BYTES", 1 << 30))
+
+
+def estimate_size(value):
+    """
+    Approximate bytes held by a cached value.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (np.ndarray, search_index.TextIndex, search_index.SortedIndex)):
+        return int(value.nbytes)
+    if isinstance(value, faiss.Index):
+        return value.ntotal * value.d * 4
+    if isinstance(value, dict):
+        return sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class DatasetCache:
+    """
+    LRU of uploaded datasets and everything derived from them, keyed by content hash.
+
+    Keys are tuples starting with the file digest, so a re-upload of the same
+    bytes (in any session) finds the parsed frame, column indexes, search
+    and query results and retrieval indexes built before. Entries are evicted least
+    recently used first once their estimated size passes `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=DATASET_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "evicted_bytes": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._building = {}
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for `key`, computing and storing it on a miss.
+
+        Concurrent misses for the same key wait for a single computation.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return self._entries[key][0]
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return self._entries[key][0]
+                self.counters["misses"] += 1
+            try:
+                value = compute()
+                self._store(key, value, estimate_size(value))
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+        return value
+
+    def _store(self, key, value, size):
+        with self._lock:
+            if size > self.max_bytes:
+                print(f"Not caching {key[1:]}: {size / 1e6:.1f} MB is over the {self.max_bytes / 1e6:.0f} MB cap")
+                return
+            self._entries[key] = (value, size)
+            self.bytes_used += size
+            while self.bytes_used > self.max_bytes:
+                evicted_key, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes_used -= evicted_size
+                self.counters["evictions"] += 1
+                self.counters["evicted_bytes"] += evicted_size
+                print(f"Dataset cache evicted {evicted_key[1:]} ({evicted_size / 1e6:.1f} MB)")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters, entries=len(self._entries), bytes_used=self.bytes_used,
+                         max_bytes=self.max_bytes)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else None
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_dataset_cache():
+    """
+    Process-wide dataset cache shared by every session.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DatasetCache()
+    return _cache
+
+
+def load(file, digest=None):
+    """
+    Return (digest, DataFrame) for an uploaded file, parsing it only on the first upload of its contents.
+    """
+    digest = digest or dataset_utils.file_digest(file)
+    return digest, get_dataset_cache().get_or_compute((digest, "frame"), lambda: dataset_utils.load_dataset(file))
+
+
+def column_index(digest, df, column):
+    """
+    Search index for one column of the upload, built on its first query.
+    """
+    return get_dataset_cache().get_or_compute(
+        (digest, "column_index", column), lambda: search_index.build_column_index(df[column])
+    )
+
+
+def search(digest, df, query, column):
+    return get_dataset_cache().get_or_compute(
+        (digest, "search", column, query),
+        lambda: dataset_utils.search_dataset(df, query, column, column_index(digest, df, column)),
+    )
+
+
+def query(digest, df, predicates, text):
+    """
+    (rows, plan report) for a parsed compound query; `text` is the query as typed, the cache key.
+    """
+    return get_dataset_cache().get_or_compute(
+        (digest, "query", text),
+        lambda: dataset_query.run_query(df, predicates, lambda column: column_index(digest, df, column)),
+    )
+
+
+def retrieval_index(digest, df, text_column, selection=None):
+    """
+    FAISS index over `text_column` of `df`; `selection` identifies which rows of the upload `df` holds.
+    """
+    return get_dataset_cache().get_or_compute(
+        (digest, "retrieval", text_column, selection), lambda: dataset_utils.index_dataframe(df, text_column)
+    )
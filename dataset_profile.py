@@ -0,0 +1,194 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Rows converted to one float64 block at a time.
+PROFILE_CHUNK_ROWS = 1_000_000
+# Rows kept in the uniform sample quantiles are read from; up to this many rows they are exact.
+QUANTILE_SAMPLE_SIZE = 100_000
+QUANTILES = (0.25, 0.5, 0.75)
+# Most frequent values reported per categorical column, and the distinct values counted
+# before a column is treated as an identifier and only its nulls are tracked.
+PROFILE_TOP_K = 5
+PROFILE_MAX_DISTINCT = 10_000
+
+
+class DatasetProfile:
+    """
+    Column statistics of a dataset, updated as rows arrive.
+
+    Numeric columns are converted to one float64 block per chunk and reduced
+    column-wise in a single vectorized pass (count, mean, sum of squared
+    deviations, min, max); chunk results are merged with Chan's parallel
+    variance update, so appending rows only costs a pass over the new rows.
+    Quantiles come from a uniform bottom-k sample of rows (random priorities,
+    the `QUANTILE_SAMPLE_SIZE` smallest kept), which merges the same way and is
+    the whole dataset, hence exact, for smaller inputs. Categorical and text
+    columns keep value counts for cardinality and top-k; every column keeps its
+    null count.
+    """
+
+    def __init__(self, sample_size=QUANTILE_SAMPLE_SIZE, seed=None):
+        self.sample_size = sample_size
+        self.rows = 0
+        self._rng = np.random.default_rng(seed)
+        self._start(pd.DataFrame())
+
+    def _start(self, df):
+        self.columns = list(df.columns)
+        self.column_types = df.dtypes.to_dict()
+        self.numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
+        # Text columns are object dtype under pandas 2 and the string dtype under pandas 3.
+        self.categorical_columns = [column for column, dtype in df.dtypes.items()
+                                    if dtype == object or isinstance(dtype, pd.CategoricalDtype)
+                                    or pd.api.types.is_string_dtype(dtype)]
+        self.date_columns = df.select_dtypes(include=['datetime', 'datetimetz']).columns.tolist()
+        width = len(self.numeric_columns)
+        self.null_counts = pd.Series(0, index=df.columns, dtype=np.int64)
+        self.count = np.zeros(width)
+        self.mean = np.zeros(width)
+        self.m2 = np.zeros(width)
+        self.min = np.full(width, np.nan)
+        self.max = np.full(width, np.nan)
+        self.sample = np.empty((0, width))
+        self.sample_keys = np.empty(0, dtype=np.float32)
+        self.value_counts = {column: pd.Series(dtype=np.int64) for column in self.categorical_columns}
+        self.date_range = {column: (pd.NaT, pd.NaT) for column in self.date_columns}
+
+    def update(self, df):
+        """
+        Add the rows of `df` (same columns as the first update) to the profile.
+        """
+        if not self.columns:
+            self._start(df)
+        elif list(df.columns) != self.columns:
+            raise ValueError("Appended rows must have the profiled columns, in the same order")
+        for start in range(0, len(df), PROFILE_CHUNK_ROWS):
+            self._update_chunk(df.iloc[start:start + PROFILE_CHUNK_ROWS])
+        return self
+
+    def _update_chunk(self, chunk):
+        rows = len(chunk)
+        self.rows += rows
+        self.null_counts += chunk.isna().sum().astype(np.int64)
+
+        if self.numeric_columns:
+            block = chunk[self.numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            missing = np.isnan(block)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                if missing.any():
+                    count = rows - missing.sum(axis=0)
+                    deviation = np.where(missing, 0.0, block)
+                    mean = deviation.sum(axis=0) / count
+                    deviation -= mean
+                    deviation[missing] = 0.0
+                else:
+                    count = np.full(block.shape[1], rows)
+                    mean = block.sum(axis=0) / rows
+                    deviation = block - mean
+                m2 = np.einsum('ij,ij->j', deviation, deviation)
+                total = self.count + count
+                delta = np.nan_to_num(mean - self.mean)
+                self.mean = np.where(count > 0, self.mean + delta * count / np.maximum(total, 1), self.mean)
+                self.m2 = np.where(count > 0, self.m2 + m2 + delta ** 2 * self.count * count / np.maximum(total, 1),
+                                   self.m2)
+            self.count = total
+            self.min = np.fmin(self.min, np.fmin.reduce(block, axis=0))
+            self.max = np.fmax(self.max, np.fmax.reduce(block, axis=0))
+            self._sample(block)
+
+        for column in self.categorical_columns:
+            counts = self.value_counts.get(column)
+            if counts is None:
+                continue  # Too many distinct values to count.
+            series = chunk[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes = series.cat.codes.to_numpy()
+                chunk_counts = pd.Series(np.bincount(codes[codes >= 0], minlength=len(series.cat.categories)),
+                                         index=series.cat.categories.astype(object))
+                chunk_counts = chunk_counts[chunk_counts > 0]
+            else:
+                chunk_counts = series.value_counts(sort=False)
+                chunk_counts.index = chunk_counts.index.astype(object)
+            counts = counts.add(chunk_counts, fill_value=0).astype(np.int64) if len(counts) else chunk_counts
+            self.value_counts[column] = None if len(counts) > PROFILE_MAX_DISTINCT else counts
+
+        for column in self.date_columns:
+            values = chunk[column].dropna()
+            if len(values):
+                low, high = self.date_range[column]
+                self.date_range[column] = (values.min() if low is pd.NaT else min(low, values.min()),
+                                           values.max() if high is pd.NaT else max(high, values.max()))
+
+    def _sample(self, block):
+        keys = self._rng.random(len(block), dtype=np.float32)
+        if len(block) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            block, keys = block[keep], keys[keep]
+        keys = np.concatenate((self.sample_keys, keys))
+        sample = np.concatenate((self.sample, block))
+        if len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            sample, keys = sample[keep], keys[keep]
+        self.sample, self.sample_keys = sample, keys
+
+    @property
+    def approximate(self):
+        """
+        Whether quantiles come from a sample rather than every row.
+        """
+        return self.rows > self.sample_size
+
+    def info(self):
+        """
+        The profile in the `dataset_utils.get_dataset_info` layout.
+        """
+        info = {
+            "total_rows": self.rows,
+            "total_columns": len(self.columns),
+            "column_types": dict(self.column_types),
+            "numeric_columns": list(self.numeric_columns),
+            "categorical_columns": list(self.categorical_columns),
+            "date_columns": list(self.date_columns),
+            "null_counts": self.null_counts.to_dict(),
+            "approximate_quantiles": self.approximate,
+        }
+
+        if len(self.sample) and self.numeric_columns:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)  # All-null columns have no quantiles.
+                quantiles = np.nanquantile(self.sample, QUANTILES, axis=0)
+        else:
+            quantiles = np.full((len(QUANTILES), len(self.numeric_columns)), np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self.m2 / (self.count - 1))
+        for i, col in enumerate(self.numeric_columns):
+            empty = self.count[i] == 0
+            info[f"{col}_stats"] = {
+                "mean": np.nan if empty else float(self.mean[i]),
+                "median": float(quantiles[QUANTILES.index(0.5), i]),
+                "std": float(std[i]) if self.count[i] > 1 else np.nan,
+                "min": float(self.min[i]),
+                "max": float(self.max[i]),
+                "p25": float(quantiles[0, i]),
+                "p75": float(quantiles[-1, i]),
+            }
+
+        for col in self.categorical_columns:
+            counts = self.value_counts[col]
+            info[f"{col}_values"] = {
+                "distinct": None if counts is None else len(counts),
+                "top": None if counts is None else
+                [(value, int(count)) for value, count in counts.nlargest(PROFILE_TOP_K).items()],
+            }
+        for col in self.date_columns:
+            info[f"{col}_range"] = self.date_range[col]
+        return info
+
+
+def profile_dataframe(df, sample_size=QUANTILE_SAMPLE_SIZE):
+    """
+    Profile every row of `df`; call `update` on the result with rows appended later.
+    """
+    return DatasetProfile(sample_size).update(df)
@@ -0,0 +1,197 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+import search_index
+
+# Predicates are joined by AND (any case) outside of quoted values.
+CONJUNCTION = re.compile(r'\s+AND\s+(?=(?:[^"]*"[^"]*")*[^"]*$)', re.IGNORECASE)
+PREDICATE = re.compile(r'^\s*(?P<column>.+?)\s*(?P<op>!=|>=|<=|=|>|<|~)\s*(?P<value>.*?)\s*$')
+TEXT_OPERATORS = {"=", "!=", "~"}
+# Share of rows a predicate is assumed to keep when its column has no index to count from.
+DEFAULT_SELECTIVITY = {"=": 0.1, "~": 0.25, ">": 0.33, ">=": 0.33, "<": 0.33, "<=": 0.33, "!=": 0.9}
+
+
+def _column_kind(series):
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return None
+    if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object or \
+            pd.api.types.is_string_dtype(series.dtype):
+        return "text"
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return "date"
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return "number"
+    return None
+
+
+def _resolve_column(name, columns):
+    if name in columns:
+        return name
+    matches = [column for column in columns if str(column).lower() == name.lower()]
+    return matches[0] if matches else None
+
+
+def _convert(df, column, op, value):
+    kind = _column_kind(df[column])
+    if kind is None:
+        raise ValueError(f"Column '{column}' cannot be queried")
+    if kind == "text":
+        if op not in TEXT_OPERATORS:
+            raise ValueError(f"'{op}' needs a numeric or date column; use =, != or ~ with text column '{column}'")
+        return value
+    if op == "~":
+        raise ValueError(f"'~' needs a text column; '{column}' holds {kind}s")
+    try:
+        if kind == "number":
+            return float(value)
+        date = pd.Timestamp(pd.to_datetime(value))
+        tz = df[column].dt.tz
+        if tz is not None and date.tz is None:
+            date = date.tz_localize(tz)
+        return date
+    except (ValueError, TypeError):
+        raise ValueError(f"'{value}' is not a {kind} for column '{column}'")
+
+
+def parse_query(text, df):
+    """
+    Parse a compound query such as `Age>40 AND Severity=Severe AND Symptoms~insomnia`.
+
+    Operators are =, !=, >, >=, <, <= and ~ (contains, ignoring case); text
+    columns take =, != and ~. Values may be quoted. Returns a list of
+    (column, op, value) predicates, or None when `text` is a plain search term
+    rather than a query: some clause has no operator, or its left-hand side is
+    not a column of `df` (as in `a=b` or `<3`). Raises ValueError for a clause
+    on a column that is missing its value or does not fit the column's type.
+    """
+    clauses = []
+    for clause in CONJUNCTION.split(text.strip()):
+        match = PREDICATE.match(clause)
+        column = _resolve_column(match.group("column"), df.columns) if match else None
+        if column is None:
+            return None
+        clauses.append((clause, column, match))
+    predicates = []
+    for clause, column, match in clauses:
+        if not match.group("value"):
+            raise ValueError(f"Cannot parse '{clause.strip()}'; expected <column><operator><value>")
+        value = match.group("value")
+        if len(value) > 1 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        predicates.append((column, match.group("op"), _convert(df, column, match.group("op"), value)))
+    return predicates
+
+
+def _estimate(index, op, value, rows):
+    """
+    Rows a predicate keeps: counted exactly from an index, otherwise a default share of `rows`.
+    """
+    if isinstance(index, search_index.SortedIndex):
+        if op == "=":
+            return index.count(value, value)
+        if op == "!=":
+            return len(index.sorted_keys) - index.count(value, value)
+        lower = value if op in (">", ">=") else None
+        upper = value if op in ("<", "<=") else None
+        return index.count(lower, upper, op != ">", op != "<")
+    if isinstance(index, search_index.TextIndex):
+        if op == "~":
+            return index.count_contains(value)
+        if op == "=":
+            return index.count_equal(value)
+        return rows - index.count_equal(value)
+    return int(rows * DEFAULT_SELECTIVITY[op])
+
+
+def _lookup(index, op, value):
+    if isinstance(index, search_index.SortedIndex):
+        if op == "=":
+            return index.equal(value)
+        lower = value if op in (">", ">=") else None
+        upper = value if op in ("<", "<=") else None
+        return index.range(lower, upper, op != ">", op != "<")
+    if op == "~":
+        return index.contains(value)
+    return index.equal(value)
+
+
+def _text_mask(series, match):
+    # Categorical columns are matched once per category, then mapped onto the codes.
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = np.asarray(match(series.cat.categories.astype(str).str), dtype=bool)
+        codes = series.cat.codes.to_numpy()
+        return (codes >= 0) & categories[np.maximum(codes, 0)] if len(categories) else np.zeros(len(codes), bool)
+    return np.asarray(match(series.str).fillna(False), dtype=bool)
+
+
+def _mask(series, op, value):
+    """
+    Vectorized evaluation of one predicate over `series`.
+    """
+    if _column_kind(series) == "text":
+        if op == "~":
+            return _text_mask(series, lambda s: s.contains(value, case=False, regex=False))
+        equal = _text_mask(series, lambda s: s.lower() == value.lower())
+        return equal if op == "=" else ~equal & series.notna().to_numpy()
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan) if _column_kind(series) == "number" else series
+    if op == "!=":
+        return np.asarray((values != value) & series.notna().to_numpy(), dtype=bool)
+    compare = {"=": np.equal, ">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal}[op]
+    return np.asarray(compare(values, value), dtype=bool)
+
+
+def plan_query(df, predicates, index_for=None):
+    """
+    Order predicates by estimated selectivity, most selective first.
+
+    `index_for(column)` returns the column's `search_index` index or None.
+    Columns with an index get exact counts; the others a default share of the
+    rows. Returns a list of steps: (column, op, value, index, estimated rows).
+    """
+    steps = []
+    for column, op, value in predicates:
+        index = index_for(column) if index_for is not None else None
+        estimate = _estimate(index, op, value, len(df))
+        if op == "!=":
+            index = None  # The index counts a complement, but scanning for it is cheaper than materializing it.
+        steps.append((column, op, value, index, estimate))
+    return sorted(steps, key=lambda step: step[4])
+
+
+def _label(value):
+    if isinstance(value, float):
+        return f"{value:g}"
+    if isinstance(value, pd.Timestamp) and value == value.normalize():
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+def run_query(df, predicates, index_for=None):
+    """
+    Rows of `df` matching every predicate, and a report of the plan that found them.
+
+    Steps run in `plan_query` order. A step with an index looks its rows up and
+    intersects them with the rows so far, unless fewer rows remain than the
+    index would return, in which case the remaining rows are filtered directly.
+    Steps without an index are evaluated vectorized over the remaining rows
+    only. Evaluation stops as soon as no rows remain.
+    """
+    rows = None
+    report = []
+    for column, op, value, index, estimate in plan_query(df, predicates, index_for):
+        if index is not None and (rows is None or estimate <= len(rows)):
+            found = _lookup(index, op, value)
+            rows = found if rows is None else search_index.intersect(rows, found)
+            method = "index"
+        else:
+            series = df[column] if rows is None else df[column].iloc[rows]
+            mask = _mask(series, op, value)
+            rows = np.flatnonzero(mask) if rows is None else rows[mask]
+            method = "scan"
+        report.append({"predicate": f"{column}{op}{_label(value)}",
+                       "method": method, "estimate": estimate, "rows": len(rows)})
+        if len(rows) == 0:
+            break
+    return (df if rows is None else df.iloc[rows]), report
@@ -4,39 +4,226 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from sentence_transformers import SentenceTransformer
 import faiss
-import pickle
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import hashlib
+import os
+import re
+import resource
+import tempfile
+import threading
+import time
+import torch
 
-def load_dataset(file):
-    if file.name.endswith('.csv'):
-        return pd.read_csv(file)
-    elif file.name.endswith('.xlsx'):
-        return pd.read_excel(file)
+import dataset_profile
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+# Rows read from the source per chunk and texts per encode batch when building an index.
+EMBEDDING_CHUNK_SIZE = 10000
+EMBEDDING_BATCH_SIZE = 256
+# Approximate index types accepted by create_faiss_index; 'flat' is the exact baseline.
+FAISS_INDEX_TYPES = ('flat', 'ivf_flat', 'ivf_pq', 'hnsw')
+# Vectors used to train IVF coarse quantizers (and PQ codebooks).
+IVF_TRAINING_SAMPLE_SIZE = 50000
+# CPU threads torch may use for encoding; unset keeps torch's default.
+EMBEDDING_THREADS = os.environ.get("EMBEDDING_THREADS")
+
+# Rows sampled to choose compact column types, and bytes per block of the streamed CSV parse.
+SCHEMA_SAMPLE_ROWS = 10000
+CSV_BLOCK_SIZE = 16 << 20
+# String columns with at most this many distinct values, mostly repeated, are loaded as categoricals.
+CATEGORY_MAX_UNIQUE = 1000
+CATEGORY_MAX_RATIO = 0.5
+# XLSX uploads are converted to Parquet here once, keyed by content hash.
+DATASET_CACHE_DIR = ".dataset_cache"
+# Index versions kept on disk besides the published one, for readers still loading them.
+INDEX_VERSIONS_TO_KEEP = 2
+# Text columns become dates only if every value starts with a date with a 4-digit year,
+# year first or last, so codes such as '1-2-0' or '12/28/5' stay strings.
+DATE_PATTERN = r'^(?:\d{4}[-/.]\d{1,2}[-/.]\d{1,2}|\d{1,2}[-/.]\d{1,2}[-/.]\d{4})(?![\d])'
+
+_embedding_models = {}
+_embedding_models_lock = threading.Lock()
+_warm_up_started = False
+
+def file_digest(file):
+    """
+    SHA-256 of a path's or file object's contents; a file object's position is preserved.
+    """
+    digest = hashlib.sha256()
+    if isinstance(file, str):
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
     else:
+        position = file.tell()
+        file.seek(0)
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+        file.seek(position)
+    return digest.hexdigest()
+
+def _looks_like_dates(values):
+    values = values.astype(str)
+    return bool(values.str.match(DATE_PATTERN).all())
+
+def _parse_dates(values):
+    """
+    Parse a text column as dates, or return None if any value is not a date.
+    """
+    present = values.dropna().astype(str)
+    if not _looks_like_dates(present):
+        return None
+    parsed = pd.to_datetime(values, errors='coerce', format='mixed')
+    return parsed if parsed.isna().sum() == values.isna().sum() else None
+
+def _is_text(values):
+    # Plain object columns, and the string dtype newer pandas versions infer for text.
+    return values.dtype == object or pd.api.types.is_string_dtype(values.dtype)
+
+def infer_schema(sample):
+    """
+    Choose compact types from a sample of rows.
+
+    Returns lists of the columns to load as categoricals, to parse as dates
+    and to downcast as integers.
+    """
+    schema = {'category': [], 'datetime': [], 'integer': []}
+    for column in sample.columns:
+        values = sample[column]
+        if pd.api.types.is_integer_dtype(values):
+            schema['integer'].append(column)
+        elif _is_text(values):
+            values = values.dropna()
+            if values.empty:
+                continue
+            if _parse_dates(values.head(1000)) is not None:
+                schema['datetime'].append(column)
+            else:
+                distinct = values.nunique()
+                if distinct <= CATEGORY_MAX_UNIQUE and distinct <= len(values) * CATEGORY_MAX_RATIO:
+                    schema['category'].append(column)
+    return schema
+
+def apply_schema(df, schema):
+    for column in schema['category']:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    for column in schema['integer']:
+        if column in df.columns and pd.api.types.is_integer_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast='integer')
+    for column in schema['datetime']:
+        if column in df.columns and _is_text(df[column]):
+            parsed = _parse_dates(df[column])
+            # Keep the strings if anything beyond the sample is not a date.
+            if parsed is not None:
+                df[column] = parsed
+    return df
+
+def _read_csv_compact(file):
+    sample = pd.read_csv(file, nrows=SCHEMA_SAMPLE_ROWS)
+    file.seek(0)
+    schema = infer_schema(sample)
+    convert_options = pa_csv.ConvertOptions(
+        column_types={column: pa.dictionary(pa.int32(), pa.string()) for column in schema['category']},
+        strings_can_be_null=True,
+    )
+    try:
+        reader = pa_csv.open_csv(file, read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+                                 convert_options=convert_options)
+        table = pa.Table.from_batches(list(reader), reader.schema)
+        df = table.to_pandas(self_destruct=True)
+        del table
+    except pa.ArrowInvalid as e:
+        # Block-wise type inference fails when a later block contradicts the first one.
+        print(f"Streaming CSV parse failed, falling back to pandas: {str(e)}")
+        file.seek(0)
+        df = pd.read_csv(file)
+    return apply_schema(df, schema)
+
+def _read_xlsx_cached(file):
+    cache_path = os.path.join(DATASET_CACHE_DIR, f"{file_digest(file)}.parquet")
+    if os.path.exists(cache_path):
+        return pd.read_parquet(cache_path), 'xlsx-cache'
+    df = pd.read_excel(file)
+    df = apply_schema(df, infer_schema(df.head(SCHEMA_SAMPLE_ROWS)))
+    try:
+        os.makedirs(DATASET_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.tmp"
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"Could not cache {getattr(file, 'name', file)} as Parquet: {str(e)}")
+    return df, 'xlsx'
+
+def _peak_rss():
+    # ru_maxrss is reported in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def load_dataset(file):
+    """
+    Load an uploaded CSV or XLSX file (or a path to one) with compact column types.
+
+    Low-cardinality strings become categoricals, integers are downcast and date
+    strings are parsed, based on a sample of the first rows. CSV is parsed block
+    by block with pyarrow; XLSX is converted to Parquet once and read from the
+    cache afterwards. Parse time and memory figures are printed and kept in
+    `df.attrs['load_stats']`.
+    """
+    name = file if isinstance(file, str) else file.name
+    if not name.endswith(('.csv', '.xlsx')):
         raise ValueError("Unsupported file format. Please upload a CSV or XLSX file.")
 
-def get_dataset_info(df):
-    info = {
-        "total_rows": len(df),
-        "total_columns": len(df.columns),
-        "column_types": df.dtypes.to_dict(),
-        "numeric_columns": df.select_dtypes(include=[np.number]).columns.tolist(),
-        "categorical_columns": df.select_dtypes(include=['object']).columns.tolist(),
-        "date_columns": df.select_dtypes(include=['datetime64']).columns.tolist(),
+    start = time.perf_counter()
+    peak_before = _peak_rss()
+    source = open(file, 'rb') if isinstance(file, str) else file
+    try:
+        if name.endswith('.csv'):
+            df, parsed_from = _read_csv_compact(source), 'csv'
+        else:
+            df, parsed_from = _read_xlsx_cached(source)
+    finally:
+        if source is not file:
+            source.close()
+
+    peak_after = _peak_rss()
+    df.attrs['load_stats'] = {
+        'source': parsed_from,
+        'rows': len(df),
+        'parse_seconds': time.perf_counter() - start,
+        'memory_bytes': int(df.memory_usage(deep=True).sum()),
+        'peak_rss_bytes': peak_after,
+        'peak_rss_growth_bytes': peak_after - peak_before,
     }
-    
-    for col in info["numeric_columns"]:
-        info[f"{col}_stats"] = {
-            "mean": df[col].mean(),
-            "median": df[col].median(),
-            "std": df[col].std(),
-            "min": df[col].min(),
-            "max": df[col].max()
-        }
-    
-    return info
-
-def search_dataset(df, query, column):
-    if df[column].dtype == 'object':
+    stats = df.attrs['load_stats']
+    print(f"Loaded {name} ({parsed_from}): {stats['rows']} rows in {stats['parse_seconds']:.2f}s, "
+          f"{stats['memory_bytes'] / 1e6:.1f} MB in memory, peak RSS {stats['peak_rss_bytes'] / 1e6:.0f} MB "
+          f"(+{stats['peak_rss_growth_bytes'] / 1e6:.0f} MB)")
+    return df
+
+def get_dataset_info(df):
+    """
+    Column types and statistics of `df`, computed in one pass by `dataset_profile`.
+
+    Numeric columns get mean, median, std, min, max and quartiles (sampled
+    beyond `dataset_profile.QUANTILE_SAMPLE_SIZE` rows); text and categorical
+    columns their cardinality and most frequent values; every column its null count.
+    """
+    return dataset_profile.profile_dataframe(df).info()
+
+def search_dataset(df, query, column, index=None):
+    """
+    Rows of `df` whose `column` matches a Quick Search query.
+
+    Text columns match case-insensitive substrings; numeric and date columns
+    match equal values. With a `search_index` index built for the column, the
+    matching rows are looked up instead of scanned.
+    """
+    if index is not None:
+        rows = index.search(query)
+        if rows is not None:
+            return df.iloc[rows]
+    if _is_text(df[column]) or isinstance(df[column].dtype, pd.CategoricalDtype):
         return df[df[column].str.contains(query, case=False, na=False)]
     elif np.issubdtype(df[column].dtype, np.number):
         try:
@@ -55,8 +242,8 @@ def search_dataset(df, query, column):
 
 def generate_charts(df):
     charts = []
-    numeric_columns = df.select_dtypes(include=['int64', 'float64']).columns
-    categorical_columns = df.select_dtypes(include=['object']).columns
+    numeric_columns = df.select_dtypes(include=[np.number]).columns
+    categorical_columns = df.select_dtypes(include=['object', 'category']).columns
 
     if len(numeric_columns) == 0 and len(categorical_columns) == 0:
         return [plt.figure(figsize=(8, 6))]
@@ -100,13 +287,106 @@ def generate_charts(df):
 
     return charts
 
+def set_embedding_threads(num_threads):
+    torch.set_num_threads(int(num_threads))
+
+def get_embedding_model(name=EMBEDDING_MODEL_NAME):
+    """
+    Return the process-wide SentenceTransformer for `name`, loading it on first use.
+    """
+    model = _embedding_models.get(name)
+    if model is None:
+        with _embedding_models_lock:
+            model = _embedding_models.get(name)
+            if model is None:
+                if EMBEDDING_THREADS:
+                    set_embedding_threads(EMBEDDING_THREADS)
+                model = SentenceTransformer(name)
+                _embedding_models[name] = model
+    return model
+
+def warm_up_embedding_model(name=EMBEDDING_MODEL_NAME):
+    get_embedding_model(name).encode(["warm-up"])
+
+def start_embedding_warm_up(name=EMBEDDING_MODEL_NAME):
+    """
+    Load and exercise the embedding model on a background thread, once per process.
+    """
+    global _warm_up_started
+    with _embedding_models_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+    threading.Thread(target=warm_up_embedding_model, args=(name,), name="embedding-warm-up", daemon=True).start()
+
 def generate_embeddings(texts):
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    return model.encode(texts)
+    return get_embedding_model().encode(texts)
+
+def default_nlist(num_vectors):
+    """
+    Number of IVF lists for `num_vectors` training points: about 4*sqrt(N),
+    keeping at least 39 points per list as faiss recommends.
+    """
+    return max(1, min(int(4 * np.sqrt(num_vectors)), num_vectors // 39))
+
+def new_faiss_index(dimension, index_type='flat', nlist=None, pq_m=8, hnsw_m=32):
+    """
+    Create an empty index of `index_type` (see FAISS_INDEX_TYPES).
+
+    IVF variants need `nlist` and must be trained before vectors are added;
+    `pq_m` sub-quantizers must divide `dimension` for 'ivf_pq'.
+    """
+    if index_type == 'flat':
+        return faiss.IndexFlatL2(dimension)
+    if index_type == 'hnsw':
+        return faiss.IndexHNSWFlat(dimension, hnsw_m)
+    if index_type in ('ivf_flat', 'ivf_pq'):
+        if nlist is None:
+            raise ValueError("IVF indexes need an nlist value.")
+        quantizer = faiss.IndexFlatL2(dimension)
+        if index_type == 'ivf_flat':
+            return faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        return faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, 8)
+    raise ValueError(f"Unsupported index type {index_type!r}. Choose one of {', '.join(FAISS_INDEX_TYPES)}.")
+
+def select_training_sample(embeddings, sample_size=IVF_TRAINING_SAMPLE_SIZE, seed=0):
+    """
+    Uniform random sample of at most `sample_size` rows for quantizer training.
+    """
+    if len(embeddings) <= sample_size:
+        return embeddings
+    rows = np.random.default_rng(seed).choice(len(embeddings), sample_size, replace=False)
+    return embeddings[np.sort(rows)]
+
+def build_trained_index(embeddings, index_type='flat', nlist=None, pq_m=8, hnsw_m=32,
+                        training_sample_size=IVF_TRAINING_SAMPLE_SIZE):
+    """
+    Create an index for `embeddings`' dimension and train it on a sample of them if needed.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    if index_type in ('ivf_flat', 'ivf_pq') and nlist is None:
+        nlist = default_nlist(min(len(embeddings), training_sample_size))
+    if index_type == 'ivf_pq' and len(embeddings) < 256:
+        raise ValueError("IVF-PQ needs at least 256 vectors to train its codebooks; use 'ivf_flat' or 'flat'.")
+    index = new_faiss_index(embeddings.shape[1], index_type, nlist, pq_m, hnsw_m)
+    if not index.is_trained:
+        index.train(select_training_sample(embeddings, training_sample_size))
+    return index
 
-def create_faiss_index(embeddings):
-    dimension = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dimension)
+def set_search_params(index, nprobe=None, ef_search=None):
+    """
+    Tune recall against latency: `nprobe` lists scanned for IVF, `efSearch` for HNSW.
+    """
+    params = faiss.ParameterSpace()
+    if nprobe is not None:
+        params.set_index_parameter(index, 'nprobe', nprobe)
+    if ef_search is not None:
+        params.set_index_parameter(index, 'efSearch', ef_search)
+    return index
+
+def create_faiss_index(embeddings, index_type='flat', nlist=None, pq_m=8, hnsw_m=32,
+                       training_sample_size=IVF_TRAINING_SAMPLE_SIZE):
+    index = build_trained_index(embeddings, index_type, nlist, pq_m, hnsw_m, training_sample_size)
     index.add(embeddings.astype('float32'))
     return index
 
@@ -116,29 +396,259 @@ def save_faiss_index(index, file_path):
 def load_faiss_index(file_path):
     return faiss.read_index(file_path)
 
-def store_dataset_embeddings(df, text_column, index_file_path, metadata_file_path):
-    texts = df[text_column].tolist()
-    embeddings = generate_embeddings(texts)
-    index = create_faiss_index(embeddings)
-    save_faiss_index(index, index_file_path)
-    
-    metadata = {
-        'text_column': text_column,
-        'index_file_path': index_file_path,
-        'original_data': df.to_dict(orient='records')
-    }
-    with open(metadata_file_path, 'wb') as f:
-        pickle.dump(metadata, f)
+def iter_dataset_chunks(source, chunk_size=EMBEDDING_CHUNK_SIZE):
+    """
+    Yield DataFrame chunks from a DataFrame, a CSV path or an uploaded CSV/XLSX file.
+
+    CSV sources are parsed `chunk_size` rows at a time; XLSX cannot be read
+    incrementally, so it is loaded once and then sliced.
+    """
+    name = source if isinstance(source, str) else getattr(source, 'name', '')
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_size):
+            yield source.iloc[start:start + chunk_size]
+    elif name.endswith('.xlsx'):
+        yield from iter_dataset_chunks(pd.read_excel(source), chunk_size)
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_size)
+
+def store_dataset_embeddings(source, text_column, index_file_path, metadata_file_path,
+                             chunk_size=EMBEDDING_CHUNK_SIZE, batch_size=EMBEDDING_BATCH_SIZE,
+                             num_workers=0, progress_callback=None, index_type='flat', nlist=None,
+                             pq_m=8, hnsw_m=32, training_sample_size=IVF_TRAINING_SAMPLE_SIZE):
+    """
+    Embed `text_column` of `source` and persist a FAISS index plus row metadata.
+
+    The source is streamed in chunks of `chunk_size` rows: each chunk is
+    encoded in batches of `batch_size` (across `num_workers` processes when
+    more than one is requested), added to the index and appended to the
+    metadata file before the next chunk is read, so only one chunk is held
+    in memory at a time. `progress_callback(rows_done, total_rows)` is called
+    after each chunk; `total_rows` is None when the source length is unknown.
+
+    For IVF index types the first `training_sample_size` vectors are held back
+    until the quantizer has been trained on them, then added in one go.
+
+    The sidecar names the index it belongs to, so it doubles as the pointer
+    that publishes them: the index is written to a new versioned file next to
+    `index_file_path` (`<index_file_path>.v<n>`), then the sidecar is renamed
+    over `metadata_file_path`. A concurrent `load_dataset_embeddings` sees
+    either the old index and rows or the new ones, never a mix.
+    """
+    model = get_embedding_model()
+    dimension = model.get_sentence_embedding_dimension()
+    index = None
+    if index_type not in ('ivf_flat', 'ivf_pq'):
+        index = new_faiss_index(dimension, index_type, nlist, pq_m, hnsw_m)
+    untrained = []
+    total_rows = len(source) if isinstance(source, pd.DataFrame) else None
+    rows_done = 0
+    pool = model.start_multi_process_pool(['cpu'] * num_workers) if num_workers > 1 else None
+    writer = None
+    version_path = f"{index_file_path}.v{time.time_ns()}"
+    fd, tmp_metadata_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(metadata_file_path)),
+                                             prefix=f".{os.path.basename(metadata_file_path)}.")
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp_metadata_path, 'wb') as sink:
+            for chunk in iter_dataset_chunks(source, chunk_size):
+                texts = chunk[text_column].astype(object).fillna('').astype(str).tolist()
+                if pool is not None:
+                    embeddings = model.encode_multi_process(texts, pool, batch_size=batch_size)
+                else:
+                    embeddings = model.encode(texts, batch_size=batch_size)
+                embeddings = np.asarray(embeddings, dtype='float32')
+                if index is None:
+                    untrained.append(embeddings)
+                    if sum(len(e) for e in untrained) >= training_sample_size:
+                        index = _train_buffered_index(untrained, index_type, nlist, pq_m, hnsw_m,
+                                                      training_sample_size)
+                        untrained = []
+                else:
+                    index.add(embeddings)
+                if writer is None:
+                    schema = _metadata_schema(chunk, text_column, version_path)
+                    writer = pa.ipc.new_file(sink, schema)
+                writer.write_table(_metadata_table(chunk, schema))
+                rows_done += len(chunk)
+                if progress_callback is not None:
+                    progress_callback(rows_done, total_rows)
+            if writer is None:
+                writer = pa.ipc.new_file(sink, _metadata_schema(pd.DataFrame(), text_column, version_path))
+            writer.close()
+        if index is None:
+            if untrained:
+                index = _train_buffered_index(untrained, index_type, nlist, pq_m, hnsw_m, training_sample_size)
+            else:
+                index = new_faiss_index(dimension)
+        _save_index_version(index, version_path)
+        os.chmod(tmp_metadata_path, 0o644)
+        os.replace(tmp_metadata_path, metadata_file_path)
+    except BaseException:
+        if os.path.exists(tmp_metadata_path):
+            os.remove(tmp_metadata_path)
+        raise
+    finally:
+        if pool is not None:
+            model.stop_multi_process_pool(pool)
+    _remove_old_index_versions(index_file_path, version_path)
+
+def _save_index_version(index, version_path):
+    """
+    Write the index under a temporary name, then rename it to `version_path` once complete.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(version_path)),
+                                    prefix=f".{os.path.basename(version_path)}.")
+    os.close(fd)
+    try:
+        save_faiss_index(index, tmp_path)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates the file owner-only.
+        os.replace(tmp_path, version_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def _remove_old_index_versions(index_file_path, published_path):
+    directory = os.path.dirname(os.path.abspath(index_file_path))
+    pattern = re.compile(re.escape(os.path.basename(index_file_path)) + r'\.v(\d+)$')
+    versions = []
+    for entry in os.listdir(directory):
+        match = pattern.match(entry)
+        if match and entry != os.path.basename(published_path):
+            versions.append((int(match.group(1)), entry))
+    versions.sort()
+    for _, entry in versions[:-INDEX_VERSIONS_TO_KEEP or None]:
+        try:
+            os.remove(os.path.join(directory, entry))
+        except FileNotFoundError:
+            pass  # Another writer cleaned it up first.
+
+def _metadata_schema(chunk, text_column, index_file_path):
+    """
+    Arrow schema for the metadata sidecar, inferred from the first chunk.
+
+    Columns that are entirely empty in that chunk are stored as strings so later
+    chunks with values still fit; read_csv gives such columns float64 NaN, not
+    nulls. The embedding settings ride along as schema metadata.
+    """
+    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type) or (len(chunk) and chunk[field.name].isna().all()):
+            schema = schema.set(i, pa.field(field.name, pa.string()))
+    return schema.with_metadata({'text_column': text_column, 'index_file_path': index_file_path})
+
+def _metadata_table(chunk, schema):
+    """
+    Convert a chunk to the sidecar schema, casting columns whose type differs from the first chunk's.
+
+    Values of a string column are stored as their text; values that do not parse
+    as a numeric or date column's type are stored as nulls, with a warning.
+    """
+    arrays = []
+    for field in schema:
+        values = chunk[field.name]
+        try:
+            arrays.append(pa.Array.from_pandas(values, type=field.type))
+            continue
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            converted = values.astype(object).where(values.notna(), None).map(
+                lambda value: value if value is None else str(value))
+        elif pa.types.is_timestamp(field.type) or pa.types.is_date(field.type):
+            converted = pd.to_datetime(values, errors='coerce')
+        else:
+            converted = pd.to_numeric(values, errors='coerce')
+        dropped = int(converted.isna().sum() - values.isna().sum())
+        if dropped:
+            print(f"Warning: {dropped} values of column '{field.name}' do not fit its "
+                  f"{field.type} metadata type and are stored as nulls")
+        arrays.append(pa.Array.from_pandas(converted, type=field.type, safe=False))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def _train_buffered_index(buffered, index_type, nlist, pq_m, hnsw_m, training_sample_size):
+    embeddings = np.concatenate(buffered)
+    index = build_trained_index(embeddings, index_type, nlist, pq_m, hnsw_m, training_sample_size)
+    index.add(embeddings)
+    return index
 
 def load_dataset_embeddings(index_file_path, metadata_file_path):
+    """
+    Load the FAISS index and memory-map its Arrow metadata sidecar.
+
+    The sidecar is opened first and the index it names is loaded, so the pair
+    always comes from the same `store_dataset_embeddings` run; `index_file_path`
+    is only used for sidecars that do not name one. Row i of `metadata['rows']`
+    belongs to FAISS id i. The table is backed by the mapped file, so nothing
+    is copied into memory until rows are fetched.
+    """
+    rows = pa.ipc.open_file(pa.memory_map(metadata_file_path, 'r')).read_all()
+    settings = {key.decode(): value.decode() for key, value in (rows.schema.metadata or {}).items()}
+    index_file_path = settings.get('index_file_path', index_file_path)
     index = load_faiss_index(index_file_path)
-    with open(metadata_file_path, 'rb') as f:
-        metadata = pickle.load(f)
+    metadata = {
+        'text_column': settings.get('text_column'),
+        'index_file_path': index_file_path,
+        'rows': rows,
+    }
     return index, metadata
 
-def search_similar_texts(query, index, metadata, k=5):
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    query_embedding = model.encode([query])
-    D, I = index.search(query_embedding.astype('float32'), k)
-    results = [metadata['original_data'][i] for i in I[0]]
-    return results
\ No newline at end of file
+def fetch_metadata_rows(metadata, ids):
+    """
+    Return the metadata records for FAISS ids `ids`.
+
+    Skips the -1 padding ids and any id listed in `metadata['deleted_ids']`.
+    When `metadata['row_ids']` is present (an ID-addressable store), ids are
+    mapped to table rows through that sorted array instead of by position.
+    """
+    deleted = metadata.get('deleted_ids') or ()
+    ids = [int(i) for i in ids if i != -1 and i not in deleted]
+    row_ids = metadata.get('row_ids')
+    if row_ids is not None:
+        ids = np.searchsorted(row_ids, ids).tolist()
+    if isinstance(metadata['rows'], pd.DataFrame):
+        return metadata['rows'].iloc[ids].to_dict(orient='records')
+    return metadata['rows'].take(pa.array(ids, type=pa.int64())).to_pylist()
+
+def index_dataframe(df, text_column, batch_size=EMBEDDING_BATCH_SIZE, **index_options):
+    """
+    Embed `text_column` of an in-memory DataFrame and return (index, metadata).
+
+    Nothing is written to disk; row i of `metadata['rows']` is FAISS id i.
+    `index_options` are passed to `create_faiss_index`.
+    """
+    model = get_embedding_model()
+    texts = df[text_column].astype(object).fillna('').astype(str).tolist()
+    if texts:
+        embeddings = np.asarray(model.encode(texts, batch_size=batch_size), dtype='float32')
+        index = create_faiss_index(embeddings, **index_options)
+    else:
+        index = new_faiss_index(model.get_sentence_embedding_dimension())
+    return index, {'text_column': text_column, 'rows': df.reset_index(drop=True)}
+
+def embed_query(query):
+    return np.asarray(get_embedding_model().encode([query]), dtype='float32')
+
+def search_by_embedding(query_embedding, index, metadata, k=5):
+    if index.ntotal == 0:
+        return []
+    # Over-fetch by the number of tombstoned vectors so k live rows survive filtering.
+    fetch = min(k + len(metadata.get('deleted_ids') or ()), index.ntotal)
+    D, I = index.search(query_embedding, fetch)
+    return fetch_metadata_rows(metadata, I[0])[:k]
+
+def search_similar_texts(query, index, metadata, k=5, timings=None):
+    """
+    Return the metadata rows of the `k` nearest neighbours of `query`.
+
+    If `timings` is a dict, the query embedding and index search times are
+    recorded in it as 'embedding_ms' and 'search_ms'.
+    """
+    start = time.perf_counter()
+    query_embedding = embed_query(query)
+    embedded = time.perf_counter()
+    results = search_by_embedding(query_embedding, index, metadata, k)
+    if timings is not None:
+        timings['embedding_ms'] = (embedded - start) * 1000
+        timings['search_ms'] = (time.perf_counter() - embedded) * 1000
+    return results
@@ -0,0 +1,349 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+from contextlib import contextmanager
+
+import faiss
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import dataset_utils
+
+# Rebuild the index once this share of its vectors are tombstones.
+COMPACTION_THRESHOLD = 0.2
+# Snapshots kept on disk besides the current one, for readers still using them.
+SNAPSHOTS_TO_KEEP = 2
+
+ROW_ID = '_row_id'
+KEY = '_key'
+ROW_HASH = '_row_hash'
+TEXT_HASH = '_text_hash'
+INTERNAL_COLUMNS = (ROW_ID, KEY, ROW_HASH, TEXT_HASH)
+
+
+def _hash_values(values):
+    return [hashlib.sha1(value.encode('utf-8')).hexdigest() for value in values]
+
+
+class EmbeddingStore:
+    """
+    ID-addressable embedding store with incremental upserts and deletes.
+
+    Vectors live in a FAISS `IndexIDMap2`, keyed by row ids that are never
+    reused. Each row also records its key, a hash of its embedded text and a
+    hash of the whole row, so an upsert only re-embeds rows whose text
+    changed; metadata-only changes keep their vector. Replaced and deleted
+    rows are tombstoned and filtered at search time until `compact` drops
+    them from the index.
+
+    Every write produces a new immutable snapshot directory (index, Arrow
+    rows, tombstones, manifest) and then atomically repoints `CURRENT` at it.
+    Writers serialize on a lock file; readers never lock and always see a
+    complete snapshot.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.snapshot_name = None
+        self.manifest = None
+        self.index = None
+        self.rows = None
+        self.deleted_ids = set()
+        self.refresh()
+
+    @classmethod
+    def create(cls, directory, text_column, key_column, index_type='flat', nlist=None, pq_m=8, hnsw_m=32):
+        """
+        Initialise an empty store in `directory`.
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest = {
+            'version': 0,
+            'text_column': text_column,
+            'key_column': key_column,
+            'index_type': index_type,
+            'index_params': {'nlist': nlist, 'pq_m': pq_m, 'hnsw_m': hnsw_m},
+            'next_row_id': 0,
+        }
+        with _locked(directory):
+            if os.path.exists(os.path.join(directory, 'CURRENT')):
+                raise FileExistsError(f"An embedding store already exists in {directory}")
+            _write_snapshot(directory, manifest, None, None, [])
+        return cls(directory)
+
+    def refresh(self):
+        """
+        Switch to the latest committed snapshot if another writer has published one.
+        """
+        with open(os.path.join(self.directory, 'CURRENT')) as f:
+            name = f.read().strip()
+        if name == self.snapshot_name:
+            return False
+        path = os.path.join(self.directory, name)
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+        index_path = os.path.join(path, 'index.faiss')
+        self.index = dataset_utils.load_faiss_index(index_path) if os.path.exists(index_path) else None
+        self.rows = pa.ipc.open_file(pa.memory_map(os.path.join(path, 'rows.arrow'), 'r')).read_all()
+        self.deleted_ids = set(np.load(os.path.join(path, 'tombstones.npy')).tolist())
+        self.manifest = manifest
+        self.snapshot_name = name
+        return True
+
+    def snapshot(self):
+        """
+        Return (index, metadata) for `dataset_utils.search_similar_texts`.
+        """
+        index = self.index if self.index is not None else dataset_utils.new_faiss_index(1)
+        metadata = {
+            'text_column': self.manifest['text_column'],
+            'rows': self.rows.drop_columns([c for c in INTERNAL_COLUMNS if c in self.rows.column_names]),
+            'row_ids': self.rows.column(ROW_ID).to_numpy() if self.rows.num_rows else np.array([], dtype=np.int64),
+            'deleted_ids': self.deleted_ids,
+        }
+        return index, metadata
+
+    def search(self, query, k=5):
+        self.refresh()
+        index, metadata = self.snapshot()
+        return dataset_utils.search_similar_texts(query, index, metadata, k)
+
+    def _live_rows(self):
+        """
+        Map key -> (row id, row hash, text hash) for rows that are not tombstoned.
+        """
+        if not self.rows.num_rows:
+            return {}
+        columns = [self.rows.column(c).to_pylist() for c in (KEY, ROW_ID, ROW_HASH, TEXT_HASH)]
+        return {
+            key: (row_id, row_hash, text_hash)
+            for key, row_id, row_hash, text_hash in zip(*columns)
+            if row_id not in self.deleted_ids
+        }
+
+    def upsert(self, df, batch_size=dataset_utils.EMBEDDING_BATCH_SIZE):
+        """
+        Add new rows of `df` and update changed ones, matched on the key column.
+
+        Returns counts of added, re-embedded, metadata-only and unchanged rows.
+        """
+        with self._writing():
+            return self._upsert(df, batch_size)
+
+    def delete(self, keys):
+        """
+        Tombstone the rows with the given keys. Returns how many were live.
+        """
+        with self._writing():
+            live = self._live_rows()
+            removed = [live[str(key)][0] for key in keys if str(key) in live]
+            self._commit(self.index, self.rows, self.deleted_ids | set(removed))
+            return len(removed)
+
+    def sync(self, df, batch_size=dataset_utils.EMBEDDING_BATCH_SIZE):
+        """
+        Make the store mirror `df`: upsert its rows and tombstone keys it no longer has.
+        """
+        with self._writing():
+            counts = self._upsert(df, batch_size, commit=False)
+            keep = set(df[self.manifest['key_column']].astype(str))
+            removed = [row_id for key, (row_id, _, _) in self._live_rows().items() if key not in keep]
+            self._commit(self.index, self.rows, self.deleted_ids | set(removed))
+            counts['deleted'] = len(removed)
+            return counts
+
+    def compact(self):
+        """
+        Drop tombstoned vectors and rows and publish the result as a new snapshot.
+        """
+        with self._writing():
+            self._compact()
+
+    @contextmanager
+    def _writing(self):
+        with _locked(self.directory):
+            self.refresh()
+            try:
+                yield
+            except BaseException:
+                # Drop half-applied in-memory changes; the next refresh reloads the snapshot.
+                self.snapshot_name = None
+                raise
+
+    def _upsert(self, df, batch_size, commit=True):
+        text_column = self.manifest['text_column']
+        key_column = self.manifest['key_column']
+        keys = df[key_column].astype(str).tolist()
+        texts = df[text_column].fillna('').astype(str).tolist()
+        text_hashes = _hash_values(texts)
+        row_hashes = pd.util.hash_pandas_object(df, index=False).astype(str).tolist()
+
+        live = self._live_rows()
+        next_row_id = self.manifest['next_row_id']
+        row_ids, to_embed, replaced, retired = [], [], set(), set()
+        counts = {'added': 0, 'reembedded': 0, 'metadata_only': 0, 'unchanged': 0}
+        for position, key in enumerate(keys):
+            current = live.get(key)
+            if current is not None and current[1] == row_hashes[position]:
+                row_ids.append(None)
+                counts['unchanged'] += 1
+            elif current is not None and current[2] == text_hashes[position]:
+                row_ids.append(current[0])
+                replaced.add(current[0])
+                counts['metadata_only'] += 1
+            else:
+                if current is not None:
+                    retired.add(current[0])
+                    counts['reembedded'] += 1
+                else:
+                    counts['added'] += 1
+                row_ids.append(next_row_id)
+                to_embed.append(position)
+                next_row_id += 1
+
+        changed = [position for position, row_id in enumerate(row_ids) if row_id is not None]
+        index = self.index
+        if to_embed:
+            model = dataset_utils.get_embedding_model()
+            embeddings = np.asarray(model.encode([texts[p] for p in to_embed], batch_size=batch_size),
+                                    dtype='float32')
+            if index is None:
+                base = dataset_utils.build_trained_index(embeddings, self.manifest['index_type'],
+                                                         **self.manifest['index_params'])
+                index = faiss.IndexIDMap2(base)
+            index.add_with_ids(embeddings, np.array([row_ids[p] for p in to_embed], dtype=np.int64))
+
+        rows = self.rows
+        if changed:
+            new_rows = df.iloc[changed].assign(**{
+                ROW_ID: [row_ids[p] for p in changed],
+                KEY: [keys[p] for p in changed],
+                ROW_HASH: [row_hashes[p] for p in changed],
+                TEXT_HASH: [text_hashes[p] for p in changed],
+            })
+            new_table = _arrow_table(new_rows)
+            if rows.num_rows:
+                rows, new_table = _unify_schemas(rows, new_table)
+                if replaced:
+                    rows = rows.filter(pc.invert(pc.is_in(rows.column(ROW_ID), pa.array(sorted(replaced)))))
+                rows = pa.concat_tables([rows, new_table]).sort_by(ROW_ID)
+            else:
+                rows = new_table
+
+        self.manifest['next_row_id'] = next_row_id
+        self.index, self.rows = index, rows
+        self.deleted_ids = self.deleted_ids | retired
+        if commit:
+            self._commit(index, rows, self.deleted_ids)
+        return counts
+
+    def _compact(self):
+        if not self.deleted_ids or self.index is None:
+            return
+        deleted = np.array(sorted(self.deleted_ids), dtype=np.int64)
+        index = self.index
+        try:
+            index.remove_ids(deleted)
+        except RuntimeError:
+            # HNSW cannot remove vectors; rebuild it from the live ones.
+            live_ids = np.setdiff1d(self.rows.column(ROW_ID).to_numpy(), deleted)
+            vectors = np.vstack([index.reconstruct(int(i)) for i in live_ids]) if len(live_ids) else None
+            base = dataset_utils.new_faiss_index(index.d, self.manifest['index_type'],
+                                                 **self.manifest['index_params'])
+            index = faiss.IndexIDMap2(base)
+            if vectors is not None:
+                index.add_with_ids(vectors, live_ids)
+        rows = self.rows.filter(pc.invert(pc.is_in(self.rows.column(ROW_ID), pa.array(deleted))))
+        self._commit(index, rows, set(), compact=False)
+
+    def _commit(self, index, rows, deleted_ids, compact=True):
+        self.manifest['version'] += 1
+        self.snapshot_name = _write_snapshot(self.directory, self.manifest, index, rows, sorted(deleted_ids))
+        self.index, self.rows, self.deleted_ids = index, rows, set(deleted_ids)
+        if compact and index is not None and index.ntotal and len(deleted_ids) / index.ntotal > COMPACTION_THRESHOLD:
+            self._compact()
+
+
+def _arrow_table(df):
+    # Columns that are entirely empty would be typed null; store them as strings
+    # so later upserts with values still fit the schema.
+    table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+    return table
+
+
+def _unify_schemas(rows, new_table):
+    """
+    Give the stored rows and the rows being upserted the same columns.
+
+    Stored columns the upsert lacks are null in the new rows; columns new to the
+    upsert are appended to the stored rows as nulls, so the schema grows rather
+    than dropping them. New rows are then cast to the stored column types.
+    """
+    for field in new_table.schema:
+        if field.name not in rows.column_names:
+            rows = rows.append_column(field, pa.nulls(rows.num_rows, field.type))
+    for field in rows.schema:
+        if field.name not in new_table.column_names:
+            new_table = new_table.append_column(field, pa.nulls(new_table.num_rows, field.type))
+    return rows, new_table.select(rows.column_names).cast(rows.schema)
+
+
+@contextmanager
+def _locked(directory):
+    with open(os.path.join(directory, 'LOCK'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _write_snapshot(directory, manifest, index, rows, deleted_ids):
+    """
+    Write a complete snapshot next to the current one, then atomically make it current.
+    """
+    name = f"snapshot-{manifest['version']:08d}"
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    if index is not None:
+        dataset_utils.save_faiss_index(index, os.path.join(tmp_path, 'index.faiss'))
+    if rows is None:
+        rows = pa.table({column: pa.array([], type=pa.int64() if column == ROW_ID else pa.string())
+                         for column in INTERNAL_COLUMNS})
+    with pa.OSFile(os.path.join(tmp_path, 'rows.arrow'), 'wb') as sink:
+        with pa.ipc.new_file(sink, rows.schema) as writer:
+            writer.write_table(rows)
+    np.save(os.path.join(tmp_path, 'tombstones.npy'), np.array(deleted_ids, dtype=np.int64))
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+
+    os.replace(tmp_path, os.path.join(directory, name))
+    current_tmp = os.path.join(directory, 'CURRENT.tmp')
+    with open(current_tmp, 'w') as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(current_tmp, os.path.join(directory, 'CURRENT'))
+
+    snapshots = sorted(entry for entry in os.listdir(directory) if entry.startswith('snapshot-'))
+    for old in snapshots[:-(SNAPSHOTS_TO_KEEP + 1)]:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+    return name
+
+
+def open_or_create(directory, text_column, key_column, **index_options):
+    if os.path.exists(os.path.join(directory, 'CURRENT')):
+        return EmbeddingStore(directory)
+    try:
+        return EmbeddingStore.create(directory, text_column, key_column, **index_options)
+    except FileExistsError:
+        return EmbeddingStore(directory)
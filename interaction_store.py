@@ -0,0 +1,548 @@
+import atexit
+import heapq
+import json
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+import pandas as pd
+
+HISTORY_DB = "interaction_history.db"
+LEGACY_HISTORY_CSV = "interaction_history.csv"
+HISTORY_PAGE_SIZE = 10
+# Newest rated interactions kept in memory for the few-shot feedback block of the prompt.
+RECENT_RATED_SIZE = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    user TEXT NOT NULL,
+    challenge TEXT NOT NULL,
+    suggestions TEXT NOT NULL,
+    feedback INTEGER
+);
+CREATE INDEX IF NOT EXISTS interactions_user_id ON interactions (user, id);
+CREATE INDEX IF NOT EXISTS interactions_rated ON interactions (id) WHERE feedback IS NOT NULL;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Moves with every write to the interactions table, from any process.
+STATS_VERSION = "SELECT version FROM feedback_stats WHERE id = 1"
+
+# Running feedback aggregates, kept current by triggers in the same
+# transaction as every write so readers never scan the interactions table.
+# The backfill statements only fire when the single stats row does not
+# exist yet, i.e. the first time a database is opened with this schema.
+STATS_SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS feedback_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_interactions INTEGER NOT NULL,
+    feedback_given INTEGER NOT NULL,
+    rating_sum INTEGER NOT NULL,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rating_histogram (
+    rating INTEGER PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_stats (
+    day TEXT PRIMARY KEY,
+    interactions INTEGER NOT NULL,
+    feedback_given INTEGER NOT NULL,
+    rating_sum INTEGER NOT NULL
+);
+
+INSERT INTO rating_histogram (rating, count)
+SELECT feedback, COUNT(*) FROM interactions
+WHERE feedback IS NOT NULL AND NOT EXISTS (SELECT 1 FROM feedback_stats)
+GROUP BY feedback;
+INSERT INTO daily_stats (day, interactions, feedback_given, rating_sum)
+SELECT substr(timestamp, 1, 10), COUNT(*), COUNT(feedback), COALESCE(SUM(feedback), 0) FROM interactions
+WHERE NOT EXISTS (SELECT 1 FROM feedback_stats)
+GROUP BY substr(timestamp, 1, 10);
+INSERT OR IGNORE INTO feedback_stats (id, total_interactions, feedback_given, rating_sum, version)
+SELECT 1, COUNT(*), COUNT(feedback), COALESCE(SUM(feedback), 0), 0 FROM interactions;
+
+CREATE TRIGGER IF NOT EXISTS interactions_stats_insert AFTER INSERT ON interactions
+BEGIN
+    UPDATE feedback_stats SET
+        total_interactions = total_interactions + 1,
+        feedback_given = feedback_given + (NEW.feedback IS NOT NULL),
+        rating_sum = rating_sum + COALESCE(NEW.feedback, 0),
+        version = version + 1;
+    INSERT INTO rating_histogram (rating, count) SELECT NEW.feedback, 1 WHERE NEW.feedback IS NOT NULL
+        ON CONFLICT (rating) DO UPDATE SET count = count + 1;
+    INSERT INTO daily_stats (day, interactions, feedback_given, rating_sum)
+        VALUES (substr(NEW.timestamp, 1, 10), 1, NEW.feedback IS NOT NULL, COALESCE(NEW.feedback, 0))
+        ON CONFLICT (day) DO UPDATE SET
+            interactions = interactions + 1,
+            feedback_given = feedback_given + excluded.feedback_given,
+            rating_sum = rating_sum + excluded.rating_sum;
+END;
+
+CREATE TRIGGER IF NOT EXISTS interactions_stats_feedback AFTER UPDATE OF feedback ON interactions
+BEGIN
+    UPDATE feedback_stats SET
+        feedback_given = feedback_given - (OLD.feedback IS NOT NULL) + (NEW.feedback IS NOT NULL),
+        rating_sum = rating_sum - COALESCE(OLD.feedback, 0) + COALESCE(NEW.feedback, 0),
+        version = version + 1;
+    UPDATE rating_histogram SET count = count - 1 WHERE rating = OLD.feedback;
+    INSERT INTO rating_histogram (rating, count) SELECT NEW.feedback, 1 WHERE NEW.feedback IS NOT NULL
+        ON CONFLICT (rating) DO UPDATE SET count = count + 1;
+    UPDATE daily_stats SET
+        feedback_given = feedback_given - (OLD.feedback IS NOT NULL) + (NEW.feedback IS NOT NULL),
+        rating_sum = rating_sum - COALESCE(OLD.feedback, 0) + COALESCE(NEW.feedback, 0)
+    WHERE day = substr(NEW.timestamp, 1, 10);
+END;
+COMMIT;
+"""
+
+INSERT_INTERACTION = (
+    "INSERT INTO interactions (timestamp, user, challenge, suggestions, feedback) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+
+
+def _parse_feedback(value):
+    if value is None or value == "":
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except TypeError:
+        pass
+    return int(float(value))
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class InteractionWriter:
+    """
+    Single writer thread that owns the store's write connection.
+
+    Callers enqueue write operations and get a Future back, so the Streamlit
+    script thread never waits on disk. The thread drains whatever is queued
+    into one `BEGIN IMMEDIATE` transaction (a group commit); each operation
+    runs under its own savepoint so a failing one does not take the rest of
+    the batch with it. Other processes writing the same database are
+    serialized by SQLite's file lock and the connection's busy timeout.
+    """
+
+    def __init__(self, path, max_batch=512):
+        self.path = path
+        self.max_batch = max_batch
+        self.batches_committed = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="interaction-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, op):
+        """
+        Queue `op(conn)` for the next group commit and return a Future for its result.
+        """
+        future = Future()
+        self._queue.put((op, future))
+        return future
+
+    def flush(self, timeout=None):
+        """
+        Block until everything submitted so far is committed.
+        """
+        if self._thread.is_alive() and self._queue.unfinished_tasks:
+            self.submit(lambda conn: None).result(timeout)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        conn = _connect(self.path)
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            received = len(batch)
+            if None in batch:
+                stop = True
+                batch = [item for item in batch if item is not None]
+            try:
+                self._commit(conn, batch)
+            finally:
+                for _ in range(received):
+                    self._queue.task_done()
+        conn.close()
+
+    def _commit(self, conn, batch):
+        if not batch:
+            return
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for op, _ in batch:
+                conn.execute("SAVEPOINT op")
+                try:
+                    results.append((op(conn), None))
+                    conn.execute("RELEASE op")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    results.append((None, e))
+            conn.execute("COMMIT")
+            self.batches_committed += 1
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), (result, error) in zip(batch, results):
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+class InteractionStore:
+    """
+    Repository for counselor interactions backed by an SQLite table in WAL mode.
+
+    Appends are a single B-tree insert instead of rewriting the whole history
+    file, readers never block the writer, and every write from this process
+    goes through one InteractionWriter.
+    """
+
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+        self._connection().executescript(STATS_SCHEMA)
+        self._stats_cache = None
+        # Bounded min-heap of the newest rated ids plus their records; None until first read.
+        self._rated_heap = None
+        self._rated = {}
+        # feedback_stats.version the window reflects; other processes' writes move it.
+        self._rated_version = None
+        self._rated_lock = threading.Lock()
+        self._feedback_version = 0
+        self._writer = InteractionWriter(path)
+        atexit.register(self.close)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def _read(self, sql, params=()):
+        self._writer.flush()
+        return self._connection().execute(sql, params).fetchall()
+
+    def flush(self):
+        self._writer.flush()
+
+    def close(self):
+        self._writer.close()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _to_record(row):
+        record = dict(row)
+        record["suggestions"] = json.loads(record["suggestions"])
+        return record
+
+    def append_async(self, timestamp, user, challenge, suggestions):
+        """
+        Queue one interaction for the writer and return a Future for its id.
+        """
+        params = (timestamp, user, challenge, json.dumps(list(suggestions)), None)
+        return self._writer.submit(lambda conn: conn.execute(INSERT_INTERACTION, params).lastrowid)
+
+    def append(self, timestamp, user, challenge, suggestions):
+        """
+        Append one interaction and return its id.
+        """
+        return self.append_async(timestamp, user, challenge, suggestions).result()
+
+    def append_many(self, rows, marker=None, row_markers=None):
+        """
+        Append (timestamp, user, challenge, suggestions, feedback) rows in one transaction.
+
+        When `marker` is given the rows are only written if that meta key is not set
+        yet, and the key is set in the same transaction. `row_markers` does the same
+        per row: a row is skipped if its marker is set, so a partly written set of
+        rows can be written again to add the rest. Returns the number of rows written.
+        """
+        params = [(ts, user, challenge, json.dumps(list(suggestions)), _parse_feedback(feedback))
+                  for ts, user, challenge, suggestions, feedback in rows]
+
+        def op(conn):
+            if marker is not None:
+                if conn.execute("SELECT 1 FROM meta WHERE key = ?", (marker,)).fetchone():
+                    return 0
+                conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (marker, str(len(params))))
+            pending = params
+            if row_markers is not None:
+                pending = []
+                for row_marker, row in zip(row_markers, params):
+                    if not conn.execute("SELECT 1 FROM meta WHERE key = ?", (row_marker,)).fetchone():
+                        conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (row_marker, "1"))
+                        pending.append(row)
+            conn.executemany(INSERT_INTERACTION, pending)
+            return len(pending)
+
+        written = self._writer.submit(op).result()
+        if written and any(p[4] is not None for p in params):
+            self._reset_recent_rated()
+        return written
+
+    def history(self, user, limit=HISTORY_PAGE_SIZE, before_id=None):
+        """
+        Return up to `limit` interactions for `user`, newest first.
+
+        Pages are addressed by keyset: pass the smallest id of the previous page as
+        `before_id` to get the next older page. Only the requested rows are read,
+        through the (user, id) index.
+        """
+        if before_id is None:
+            rows = self._read(
+                "SELECT * FROM interactions WHERE user = ? ORDER BY id DESC LIMIT ?", (user, limit)
+            )
+        else:
+            rows = self._read(
+                "SELECT * FROM interactions WHERE user = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (user, before_id, limit),
+            )
+        return [self._to_record(row) for row in rows]
+
+    def history_count(self, user):
+        return self._read("SELECT COUNT(*) FROM interactions WHERE user = ?", (user,))[0][0]
+
+    def records(self):
+        """
+        Return every interaction, oldest first.
+        """
+        return [self._to_record(row) for row in self._read("SELECT * FROM interactions ORDER BY id")]
+
+    def set_feedback_async(self, interaction_id, feedback):
+        """
+        Queue a feedback rating for one interaction, addressed by its primary key.
+
+        The Future resolves to (updated record, feedback_stats version after the update).
+        """
+        params = (_parse_feedback(feedback), int(interaction_id))
+
+        def op(conn):
+            if conn.execute("UPDATE interactions SET feedback = ? WHERE id = ?", params).rowcount == 0:
+                raise KeyError(f"Unknown interaction id {interaction_id}")
+            record = self._to_record(conn.execute("SELECT * FROM interactions WHERE id = ?", params[1:]).fetchone())
+            return record, conn.execute(STATS_VERSION).fetchone()[0]
+
+        future = self._writer.submit(op)
+        future.add_done_callback(self._note_feedback)
+        return future
+
+    def set_feedback(self, interaction_id, feedback):
+        return self.set_feedback_async(interaction_id, feedback).result()[0]
+
+    def _query_recent_rated(self, n):
+        rows = self._read("SELECT * FROM interactions WHERE feedback IS NOT NULL ORDER BY id DESC LIMIT ?", (n,))
+        return [self._to_record(row) for row in rows]
+
+    def _reset_recent_rated(self):
+        with self._rated_lock:
+            self._rated_heap = None
+            self._rated = {}
+            self._feedback_version += 1
+
+    def _note_feedback(self, future):
+        if future.exception() is not None:
+            return
+        record, version = future.result()
+        with self._rated_lock:
+            self._feedback_version += 1
+            if self._rated_heap is None:
+                return
+            if self._rated_version != version - 1:
+                # Something else was written since the window was read; re-seed on the next read.
+                self._rated_heap = None
+                self._rated = {}
+                return
+            self._rated_version = version
+            if record["feedback"] is None:
+                if record["id"] in self._rated:
+                    # An older rated interaction moves into the window; re-seed on the next read.
+                    self._rated_heap = None
+                    self._rated = {}
+            elif record["id"] in self._rated:
+                self._rated[record["id"]] = record
+            elif len(self._rated_heap) < RECENT_RATED_SIZE:
+                heapq.heappush(self._rated_heap, record["id"])
+                self._rated[record["id"]] = record
+            elif record["id"] > self._rated_heap[0]:
+                del self._rated[heapq.heapreplace(self._rated_heap, record["id"])]
+                self._rated[record["id"]] = record
+
+    def _sync_recent_rated(self):
+        """
+        Re-read the recent-rated window if the database changed since it was read.
+
+        The trigger-maintained feedback_stats.version moves with every write from
+        any process, so checking it costs one single-row read. Writes made through
+        this store advance the window in place and keep it current.
+        """
+        version = self._read(STATS_VERSION)[0][0]
+        with self._rated_lock:
+            if self._rated_heap is not None and self._rated_version == version:
+                return
+        # Read outside the lock: the writer thread takes it when feedback commits.
+        rated = {r["id"]: r for r in self._query_recent_rated(RECENT_RATED_SIZE)}
+        with self._rated_lock:
+            if rated != self._rated:
+                self._feedback_version += 1
+            self._rated = rated
+            self._rated_heap = list(rated)
+            heapq.heapify(self._rated_heap)
+            # The version read before the query, so a write racing the query only causes another re-seed.
+            self._rated_version = version
+
+    @property
+    def feedback_version(self):
+        """
+        Counter that changes whenever the recent rated interactions change, in any process.
+        """
+        self._sync_recent_rated()
+        return self._feedback_version
+
+    def recent_rated(self, n=RECENT_RATED_SIZE):
+        """
+        Return the `n` newest interactions that have a rating, newest first.
+
+        The newest RECENT_RATED_SIZE are kept in memory. Each call checks the stats
+        version and only re-reads them when another process has written since.
+        """
+        if n > RECENT_RATED_SIZE:
+            return self._query_recent_rated(n)
+        self._sync_recent_rated()
+        with self._rated_lock:
+            records = sorted(self._rated.values(), key=lambda r: r["id"], reverse=True)
+        return records[:n]
+
+    def feedback_stats(self):
+        """
+        Return the running feedback aggregates.
+
+        Reading costs one single-row lookup; the rating histogram and per-day
+        buckets are only re-read when `version` has moved since the last call.
+        """
+        version = self._read(STATS_VERSION)[0][0]
+        cached = self._stats_cache
+        if cached is not None and cached["version"] == version:
+            return cached
+
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute("SELECT * FROM feedback_stats WHERE id = 1").fetchone()
+            histogram = conn.execute(
+                "SELECT rating, count FROM rating_histogram WHERE count > 0 ORDER BY rating"
+            ).fetchall()
+            daily = conn.execute(
+                "SELECT day, feedback_given, rating_sum FROM daily_stats WHERE feedback_given > 0 ORDER BY day"
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        stats = {
+            "version": row["version"],
+            "total_interactions": row["total_interactions"],
+            "feedback_given": row["feedback_given"],
+            "average_rating": row["rating_sum"] / row["feedback_given"] if row["feedback_given"] else None,
+            "rating_histogram": {rating: count for rating, count in histogram},
+            "daily_ratings": [
+                {"day": day, "feedback_given": given, "average_rating": rating_sum / given}
+                for day, given, rating_sum in daily
+            ],
+        }
+        self._stats_cache = stats
+        return stats
+
+    def unique_users(self):
+        return self._read("SELECT COUNT(DISTINCT user) FROM interactions")[0][0]
+
+    def get_meta(self, key):
+        rows = self._read("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+
+def migrate_csv(store, csv_path=LEGACY_HISTORY_CSV):
+    """
+    One-shot import of the legacy interaction_history.csv into `store`.
+
+    Returns the number of rows imported; a CSV that was already migrated is skipped.
+    """
+    marker = f"migrated:{os.path.normpath(csv_path)}"
+    if not os.path.exists(csv_path) or store.get_meta(marker):
+        return 0
+
+    df = pd.read_csv(csv_path)
+    if "user" not in df.columns:
+        df["user"] = "Unknown"
+    df["user"] = df["user"].fillna("Unknown")
+    if "feedback" not in df.columns:
+        df["feedback"] = None
+
+    rows = [
+        (
+            row["timestamp"],
+            row["user"],
+            row["challenge"] if isinstance(row["challenge"], str) else "",
+            row["suggestions"].split("|") if isinstance(row["suggestions"], str) else [],
+            row["feedback"],
+        )
+        for row in df.to_dict("records")
+    ]
+    return store.append_many(rows, marker=marker)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Return the process-wide interaction store, migrating the legacy CSV on first use.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = InteractionStore(HISTORY_DB)
+                migrate_csv(store)
+                _store = store
+    return _store
+
+
+if __name__ == "__main__":
+    imported = migrate_csv(InteractionStore(HISTORY_DB))
+    print(f"Migrated {imported} interactions from {LEGACY_HISTORY_CSV} into {HISTORY_DB}")
@@ -6,10 +6,15 @@ from datetime import datetime
 import user_auth
 import utils
 import app_components
+import dataset_utils
+import os
 from app_components import combined_dashboard_page
 
 st.set_page_config(page_title="Mental Health Counselor Assistant", page_icon="🧠", layout="wide")
 
+if os.environ.get("EMBEDDING_WARMUP", "1") != "0":
+    dataset_utils.start_embedding_warm_up()
+
 
 st.markdown("""
 <style>
@@ -1,79 +1,263 @@
 import pandas as pd
 import numpy as np
 import os
+import hashlib
+import tempfile
+import threading
+import joblib
+from datetime import datetime
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
 
+DATASET_FILE = "mental_health_dataset.csv"
+MODEL_FILE = "depression_model.joblib"
+# Bump when the artifact layout or the training recipe changes.
+MODEL_VERSION = 1
 
-if not os.path.exists("mental_health_dataset.csv"):
-    print("Error: mental_health_dataset.csv not found. Please generate the dataset first.")
-    exit(1)
+_artifact = None
+_artifact_lock = threading.Lock()
 
 
-df = pd.read_csv("mental_health_dataset.csv")
+def dataset_hash(path=DATASET_FILE):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
-df['Depression'] = df['Diagnosis'].apply(lambda x: 1 if x == 'Major Depressive Disorder' else 0)
+def train_model(path=DATASET_FILE, verbose=True):
+    """
+    Fit the depression classifier on `path` and return the model artifact.
+    """
+    df = pd.read_csv(path)
 
+    df['Depression'] = df['Diagnosis'].apply(lambda x: 1 if x == 'Major Depressive Disorder' else 0)
 
-features = ['Age', 'Duration(weeks)', 'Severity']
-X = df[features]
-y = df['Depression']
+    features = ['Age', 'Duration(weeks)', 'Severity']
+    X = df[features]
+    y = df['Depression']
 
+    X = pd.get_dummies(X, columns=['Severity'])
 
-X = pd.get_dummies(X, columns=['Severity'])
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
 
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model.fit(X_train_scaled, y_train)
 
+    if verbose:
+        y_pred = model.predict(X_test_scaled)
+        accuracy = accuracy_score(y_test, y_pred)
+        print(f"Accuracy: {accuracy:.2f}")
+        print("\nClassification Report:")
+        print(classification_report(y_test, y_pred))
 
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
+    return {
+        "version": MODEL_VERSION,
+        "model": model,
+        "scaler": scaler,
+        "feature_columns": list(X.columns),
+        "data_hash": dataset_hash(path),
+        "trained_at": datetime.now().isoformat(),
+    }
 
 
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X_train_scaled, y_train)
+def save_model(artifact, path=MODEL_FILE):
+    # A unique temp file per writer, so replicas retraining at once never share one.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=f".{os.path.basename(path)}.")
+    os.close(fd)
+    try:
+        joblib.dump(artifact, tmp_path)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates the file owner-only.
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
 
 
-y_pred = model.predict(X_test_scaled)
+def _build_encoder(artifact):
+    """
+    Precompute where each raw input lands in the model's feature vector.
+    """
+    columns = artifact["feature_columns"]
+    scaler = artifact["scaler"]
+    return {
+        "n_features": len(columns),
+        "age_col": columns.index("Age"),
+        "duration_col": columns.index("Duration(weeks)"),
+        "severity_cols": {
+            col[len("Severity_"):]: i for i, col in enumerate(columns) if col.startswith("Severity_")
+        },
+        "mean": np.asarray(scaler.mean_, dtype=np.float64),
+        "scale": np.asarray(scaler.scale_, dtype=np.float64),
+        "positive_col": list(artifact["model"].classes_).index(1),
+    }
 
 
-accuracy = accuracy_score(y_test, y_pred)
-print(f"Accuracy: {accuracy:.2f}")
-print("\nClassification Report:")
-print(classification_report(y_test, y_pred))
+def _compile_forest(model):
+    """
+    Flatten every fitted tree into plain Python lists for the single-row path.
+
+    Each tree becomes (left, right, feature, threshold, leaf_proba) so one
+    patient can be routed through the forest without sklearn's input
+    validation and per-call dispatch. Leaf class counts are normalized the
+    same way `predict_proba` does.
+    """
+    trees = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        values = tree.value[:, 0, :]
+        totals = values.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1
+        trees.append((
+            tree.children_left.tolist(),
+            tree.children_right.tolist(),
+            tree.feature.tolist(),
+            tree.threshold.tolist(),
+            (values / totals).tolist(),
+        ))
+    return trees
+
+
+def _load_or_train():
+    artifact = None
+    if os.path.exists(MODEL_FILE):
+        try:
+            artifact = joblib.load(MODEL_FILE)
+        except Exception as e:
+            print(f"Error loading {MODEL_FILE}, retraining: {str(e)}")
+
+    if os.path.exists(DATASET_FILE):
+        stale = (
+            artifact is None
+            or artifact.get("version") != MODEL_VERSION
+            or artifact.get("data_hash") != dataset_hash(DATASET_FILE)
+        )
+        if stale:
+            artifact = train_model(DATASET_FILE, verbose=False)
+            save_model(artifact)
+    elif artifact is None:
+        raise FileNotFoundError(f"{DATASET_FILE} not found. Please generate the dataset first.")
+    return artifact
+
+
+def load_model():
+    """
+    Return the model artifact, loading it once per process.
+
+    The saved artifact is reused as long as it was trained on the current
+    dataset; otherwise the model is retrained and the artifact rewritten.
+    """
+    global _artifact
+    if _artifact is None:
+        with _artifact_lock:
+            if _artifact is None:
+                artifact = _load_or_train()
+                artifact["encoder"] = _build_encoder(artifact)
+                artifact["compiled_forest"] = _compile_forest(artifact["model"])
+                _artifact = artifact
+    return _artifact
 
 
 def predict_depression(age, duration, severity):
+    """
+    Score one patient without going through pandas or sklearn's predict path.
+
+    The inputs are written into a preallocated feature vector using the
+    precomputed encoder, then routed through the compiled forest. Results
+    match `predict_depression_batch` for the same patient.
+    """
+    artifact = load_model()
+    encoder = artifact["encoder"]
+
+    features = np.zeros(encoder["n_features"], dtype=np.float64)
+    features[encoder["age_col"]] = age
+    features[encoder["duration_col"]] = duration
+    severity_col = encoder["severity_cols"].get(severity)
+    if severity_col is not None:
+        features[severity_col] = 1
+    features -= encoder["mean"]
+    features /= encoder["scale"]
+    # sklearn compares tree thresholds against float32 inputs.
+    x = features.astype(np.float32).tolist()
+
+    trees = artifact["compiled_forest"]
+    totals = [0.0] * len(artifact["model"].classes_)
+    for left, right, feature, threshold, leaf_proba in trees:
+        node = 0
+        while left[node] != -1:
+            node = left[node] if x[feature[node]] <= threshold[node] else right[node]
+        for i, p in enumerate(leaf_proba[node]):
+            totals[i] += p
+
+    probabilities = [total / len(trees) for total in totals]
+    prediction = artifact["model"].classes_[probabilities.index(max(probabilities))]
+    return prediction, probabilities[encoder["positive_col"]]
+
+
+def _as_float(values):
+    return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def predict_depression_batch(age, duration=None, severity=None):
+    """
+    Score many patients with one `predict_proba` call.
+
+    Takes either a DataFrame with 'Age', 'Duration(weeks)' and 'Severity' columns,
+    or three equal-length arrays. Returns (predictions, probabilities) as float NumPy
+    arrays. Unknown severities are encoded as all-zero one-hot columns, as in
+    `predict_depression`; rows missing an age, duration or severity are not scored
+    and get NaN for both.
+    """
+    if isinstance(age, pd.DataFrame):
+        age, duration, severity = age['Age'], age['Duration(weeks)'], age['Severity']
 
-    input_data = pd.DataFrame([[age, duration, severity]], columns=['Age', 'Duration(weeks)', 'Severity'])
-    input_data = pd.get_dummies(input_data, columns=['Severity'])
-    
+    age = _as_float(age)
+    duration = _as_float(duration)
+    severity = np.asarray(severity, dtype=object)
+    complete = ~(np.isnan(age) | np.isnan(duration) | pd.isna(severity))
+    predictions = np.full(len(age), np.nan)
+    probabilities = np.full(len(age), np.nan)
+    if not complete.any():
+        return predictions, probabilities
+    age, duration, severity = age[complete], duration[complete], severity[complete]
 
-    for col in X.columns:
-        if col not in input_data.columns:
-            input_data[col] = 0
-    
+    artifact = load_model()
+    encoder = artifact["encoder"]
+    features = np.zeros((len(age), encoder["n_features"]), dtype=np.float64)
+    features[:, encoder["age_col"]] = age
+    features[:, encoder["duration_col"]] = duration
+    for category, col in encoder["severity_cols"].items():
+        features[:, col] = severity == category
+    features -= encoder["mean"]
+    features /= encoder["scale"]
 
-    input_data = input_data[X.columns]
-    
+    model = artifact["model"]
+    scores = model.predict_proba(features)
+    predictions[complete] = model.classes_[np.argmax(scores, axis=1)]
+    probabilities[complete] = scores[:, encoder["positive_col"]]
+    return predictions, probabilities
 
-    input_scaled = scaler.transform(input_data)
-    
 
-    prediction = model.predict(input_scaled)
-    probability = model.predict_proba(input_scaled)[0][1]
-    
-    return prediction[0], probability
+if __name__ == "__main__":
+    if not os.path.exists(DATASET_FILE):
+        print(f"Error: {DATASET_FILE} not found. Please generate the dataset first.")
+        exit(1)
 
+    artifact = train_model(DATASET_FILE)
+    save_model(artifact)
+    print(f"\nModel saved to {MODEL_FILE} (dataset hash {artifact['data_hash'][:12]})")
 
-age = 35
-duration = 12
-severity = "Moderate"
-prediction, probability = predict_depression(age, duration, severity)
-print(f"\nPrediction for Age: {age}, Duration: {duration} weeks, Severity: {severity}")
-print(f"Depression: {'Yes' if prediction == 1 else 'No'}")
-print(f"Probability of Depression: {probability:.2f}")
+    age = 35
+    duration = 12
+    severity = "Moderate"
+    prediction, probability = predict_depression(age, duration, severity)
+    print(f"\nPrediction for Age: {age}, Duration: {duration} weeks, Severity: {severity}")
+    print(f"Depression: {'Yes' if prediction == 1 else 'No'}")
+    print(f"Probability of Depression: {probability:.2f}")
@@ -1,47 +1,211 @@
 import os
+import re
+import time
 from openai import OpenAI
 import json
+import tiktoken
 import streamlit as st
-import pandas as pd
+import data_utils
+import dataset_utils
+import suggestion_cache
 
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+# Dataset rows retrieved per challenge.
+RETRIEVAL_K = 8
+
+SUGGESTION_MODEL = "gpt-4o"
+# Tokens the challenge, feedback examples and dataset context may fill together, and each
+# section's share of it. A section's unused share is passed on to the sections after it.
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", 3000))
+PROMPT_BUDGET_SPLIT = {"challenge": 0.2, "feedback": 0.3, "context": 0.5}
+# Longest value of a single dataset cell, in tokens, before it is truncated.
+CONTEXT_CELL_TOKENS = 60
+ID_COLUMN = re.compile(r"(^|[^a-z])id$", re.IGNORECASE)
+
+_openai_client = None
 
 def get_openai_client():
+    """
+    Shared synchronous client; its connection pool is reused across calls.
+    """
+    global _openai_client
     if not OPENAI_API_KEY:
         st.error("OpenAI API key is not set. Please set the OPENAI_API_KEY environment variable.")
         return None
-    return OpenAI(api_key=OPENAI_API_KEY)
+    if _openai_client is None:
+        _openai_client = OpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
+
+_feedback_examples_cache = {"version": None, "examples": []}
 
 def get_recent_feedback(n=5):
-    try:
-        df = pd.read_csv("interaction_history.csv")
-        df = df[df['feedback'] != ''].sort_values('timestamp', ascending=False).head(n)
-        return df[['challenge', 'suggestions', 'feedback']].to_dict('records')
-    except Exception:
-        return []
+    return data_utils.get_recent_rated_interactions(n)
 
-def get_suggestions(challenge: str, context: list = None) -> list:
+def get_feedback_examples():
     """
-    Get AI-generated suggestions for a given mental health challenge, incorporating recent feedback and optional context.
+    Few-shot examples of recently rated suggestions as (text, tokens) pairs, newest first.
+
+    Rebuilt only when feedback changes; each request then picks as many as fit its budget.
     """
-    openai_client = get_openai_client()
-    if not openai_client:
-        return ["Error: OpenAI API key is not set."]
+    version = data_utils.get_feedback_version()
+    if _feedback_examples_cache["version"] != version:
+        examples = []
+        for item in get_recent_feedback():
+            text = (f"Challenge: {item['challenge']}\n"
+                    f"Suggestions: {' | '.join(item['suggestions'])}\n"
+                    f"Feedback: {item['feedback']}\n\n")
+            examples.append((text, count_tokens(text)))
+        _feedback_examples_cache.update(version=version, examples=examples)
+    return _feedback_examples_cache["examples"]
+
+def retrieve_context(challenge: str, index, metadata, k: int = RETRIEVAL_K):
+    """
+    Return the `k` dataset rows most similar to the challenge, most relevant first,
+    together with the embedding and search latencies in milliseconds.
+    """
+    timings = {}
+    rows = dataset_utils.search_similar_texts(challenge, index, metadata, k, timings=timings)
+    print(f"Retrieval: embedding {timings['embedding_ms']:.1f} ms, search {timings['search_ms']:.1f} ms, "
+          f"{len(rows)} rows")
+    return rows, timings
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text.
+    return len(text) // 4 + 1
+
+_encoding = None
+
+def get_encoding():
+    """
+    The model's tiktoken encoding, or None when it cannot be loaded.
+
+    tiktoken downloads the encoding file on first use and caches it locally; without
+    it, token counts fall back to `estimate_tokens`.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model(SUGGESTION_MODEL)
+        except Exception as e:
+            print(f"Tokenizer unavailable, estimating token counts: {str(e)}")
+            _encoding = False
+    return _encoding or None
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    encoding = get_encoding()
+    if encoding is None:
+        return text if estimate_tokens(text) <= max_tokens else text[:max(max_tokens - 1, 0) * 4] + "..."
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max(max_tokens - 1, 0)]) + "..."
+
+def _cell(value) -> str:
+    text = " ".join(str(value).split())
+    return truncate_to_tokens(text, CONTEXT_CELL_TOKENS).replace("|", "/")
+
+def project_context(rows: list):
+    """
+    Reduce retrieved rows to the columns worth sending.
+
+    Drops internal bookkeeping columns, id columns and columns that are empty in
+    every row. Columns with the same value in every row are returned separately
+    so they can be stated once. Returns (columns, shared, rows as cell lists).
+    """
+    columns = []
+    for row in rows:
+        for column in row:
+            if column not in columns and not str(column).startswith("_") and not ID_COLUMN.search(str(column)):
+                columns.append(column)
+
+    def present(value):
+        return value is not None and value == value and str(value).strip() != ""
 
-    recent_feedback = get_recent_feedback()
+    columns = [c for c in columns if any(present(row.get(c)) for row in rows)]
+    shared = {}
+    if len(rows) > 1:
+        for column in columns:
+            values = {_cell(row.get(column)) if present(row.get(column)) else "" for row in rows}
+            if len(values) == 1:
+                shared[column] = values.pop()
+    columns = [c for c in columns if c not in shared]
+    cells = [[_cell(row.get(c)) if present(row.get(c)) else "" for c in columns] for row in rows]
+    return columns, shared, cells
+
+def build_context_section(context: list, budget: int):
+    """
+    Encode context rows as a pipe-separated table, most relevant rows first, within `budget` tokens.
+
+    Returns (text, tokens, rows used).
+    """
+    columns, shared, cells = project_context(context)
+    text = "Additional context from the dataset (most relevant first):\n"
+    if shared:
+        text += "All rows: " + "; ".join(f"{c}={v}" for c, v in shared.items()) + "\n"
+    if columns:
+        text += " | ".join(str(c) for c in columns) + "\n"
+    tokens = count_tokens(text)
+    if tokens > budget:
+        return "", 0, 0
+    used = 0
+    for row in cells:
+        line = " | ".join(row) + "\n"
+        line_tokens = count_tokens(line)
+        if tokens + line_tokens > budget:
+            break
+        text += line
+        tokens += line_tokens
+        used += 1
+    if used == 0 and not shared:
+        return "", 0, 0
+    return text, tokens, used
+
+def build_prompt(challenge: str, context: list = None, budget: int = None, split: dict = None):
+    """
+    Assemble the suggestion prompt. Returns (prompt, prompt_context), where
+    `prompt_context` is everything in the prompt except the challenge itself.
+
+    Token counts come from the model's tokenizer. `budget` tokens (default
+    PROMPT_TOKEN_BUDGET) are divided between the challenge, the feedback examples
+    and the dataset context according to `split`; whatever a section leaves unused
+    is passed on to the next one.
+    """
+    start = time.perf_counter()
+    budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+    split = PROMPT_BUDGET_SPLIT if split is None else split
+    available = 0
+
+    available += int(budget * split["challenge"])
+    challenge = truncate_to_tokens(challenge, available)
+    challenge_tokens = count_tokens(challenge)
+    available -= challenge_tokens
+
+    available += int(budget * split["feedback"])
     feedback_prompt = ""
-    if recent_feedback:
-        feedback_prompt = "Recent feedback on previous suggestions:\n"
-        for item in recent_feedback:
-            feedback_prompt += f"Challenge: {item['challenge']}\n"
-            feedback_prompt += f"Suggestions: {item['suggestions']}\n"
-            feedback_prompt += f"Feedback: {item['feedback']}\n\n"
-
-    context_prompt = ""
+    feedback_tokens = 0
+    examples = get_feedback_examples()
+    header = "Recent feedback on previous suggestions (rated 1-5):\n"
+    header_tokens = count_tokens(header)
+    for text, tokens in examples:
+        if header_tokens + feedback_tokens + tokens > available:
+            break
+        feedback_prompt += text
+        feedback_tokens += tokens
+    if feedback_prompt:
+        feedback_prompt = header + feedback_prompt
+        feedback_tokens += header_tokens
+    available -= feedback_tokens
+
+    available += int(budget * split["context"])
+    context_prompt, context_tokens, context_rows = "", 0, 0
     if context:
-        context_prompt = "Additional context from the dataset:\n"
-        for item in context[:5]:  # Limit to first 5 items to avoid token limit
-            context_prompt += json.dumps(item) + "\n"
+        context_prompt, context_tokens, context_rows = build_context_section(context, available)
 
     prompt = f"""
     As an AI assistant for mental health counselors, provide 3-5 helpful suggestions
@@ -57,18 +221,92 @@ def get_suggestions(challenge: str, context: list = None) -> list:
     Ensure that your suggestions are ethical, professional, and aligned with best practices
     in mental health counseling.
     """
+    print(f"Prompt: {count_tokens(prompt)} tokens (challenge {challenge_tokens}, "
+          f"feedback {feedback_tokens} from {feedback_prompt.count('Challenge: ')}/{len(examples)} examples, "
+          f"context {context_tokens} from {context_rows}/{len(context or [])} rows) "
+          f"assembled in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return prompt, feedback_prompt + context_prompt
+
+def chat_request(prompt: str) -> dict:
+    return {
+        "model": SUGGESTION_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "response_format": {"type": "json_object"},
+    }
+
+def parse_suggestions(content: str) -> list:
+    if not content:
+        raise ValueError("OpenAI returned an empty response.")
+    return json.loads(content)["suggestions"]
+
+class SuggestionStreamParser:
+    """
+    Pull completed strings out of the "suggestions" array of a JSON object as it streams in.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = None  # Scan position, once the opening bracket of the array has arrived
+        self.in_string = False
+        self.escaped = False
+        self.start = None
+        self.closed = False
+
+    def feed(self, text: str) -> list:
+        """
+        Append a chunk of model output and return the suggestions it completed.
+        """
+        self.buffer += text
+        completed = []
+        if self.pos is None:
+            match = re.search(r'"suggestions"\s*:\s*\[', self.buffer)
+            if not match:
+                return completed
+            self.pos = match.end()
+        while self.pos < len(self.buffer) and not self.closed:
+            char = self.buffer[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    completed.append(json.loads(self.buffer[self.start:self.pos + 1]))
+            elif char == '"':
+                self.in_string = True
+                self.start = self.pos
+            elif char == "]":
+                self.closed = True
+            self.pos += 1
+        return completed
+
+def get_suggestions(challenge: str, context: list = None, openai_client=None, cache=None) -> list:
+    """
+    Get AI-generated suggestions for a given mental health challenge, incorporating recent feedback and optional context.
+
+    Answers are served from the suggestion cache when the same (or, for the semantic tier, a
+    near-identical) challenge was already asked with the same feedback and context. Pass
+    `openai_client` or `cache` to substitute a stub client or a private cache.
+    """
+    prompt, prompt_context = build_prompt(challenge, context)
+
+    if cache is None:
+        cache = suggestion_cache.get_suggestion_cache()
+    cached, tier, embedding = cache.get(challenge, prompt_context)
+    if cached is not None:
+        print(f"Suggestion cache {tier} hit; hit ratio {cache.stats()['hit_ratio']:.2f}")
+        return cached
+
+    if openai_client is None:
+        openai_client = get_openai_client()
+    if not openai_client:
+        return ["Error: OpenAI API key is not set."]
 
     try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-        )
-        content = response.choices[0].message.content
-        if not content:
-            raise ValueError("OpenAI returned an empty response.")
-        
-        suggestions = json.loads(content)["suggestions"]
+        response = openai_client.chat.completions.create(**chat_request(prompt))
+        suggestions = parse_suggestions(response.choices[0].message.content)
+        cache.put(challenge, prompt_context, suggestions, embedding)
         return suggestions
     except Exception as e:
         return [f"Error generating suggestions: {str(e)}"]
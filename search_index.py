@@ -0,0 +1,309 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+NGRAM = 3
+# Tokens are runs of letters and digits, in any script (Arrow's RE2 syntax).
+TOKEN_SEPARATOR = r"[^\p{L}\p{N}]+"
+# Queries using these are regular expressions for str.contains and are answered by a scan.
+REGEX_CHARACTERS = set(".^$*+?{}[]\\|()")
+
+EMPTY_ROWS = np.empty(0, dtype=np.int64)
+# A query fragment whose postings outnumber the candidates left by this factor is not
+# gathered; the remaining candidates are substring-checked instead.
+POSTINGS_SKIP_FACTOR = 4
+
+
+def intersect(*row_sets):
+    """
+    Intersect sorted row-id arrays, smallest first, stopping as soon as the result is empty.
+    """
+    row_sets = sorted(row_sets, key=len)
+    result = row_sets[0]
+    for rows in row_sets[1:]:
+        if len(result) == 0:
+            break
+        result = np.intersect1d(result, rows, assume_unique=True)
+    return result
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def _lower(values):
+    return pc.utf8_lower(values)
+
+
+def _tokenize(values):
+    """
+    (position of the source string, token) for every token of an Arrow string array.
+    """
+    pieces = pc.split_pattern_regex(values, TOKEN_SEPARATOR)
+    parents = pc.list_parent_indices(pieces).to_numpy().astype(np.int64)
+    tokens = pc.list_flatten(pieces)
+    keep = pc.greater(pc.utf8_length(tokens), 0).to_numpy(zero_copy_only=False)
+    return parents[keep], tokens.filter(pa.array(keep))
+
+
+def _gather(offsets, items, ids):
+    """
+    Concatenate the groups `items[offsets[i]:offsets[i + 1]]` for every i in `ids`, without a Python loop.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    starts = offsets[ids]
+    lengths = offsets[ids + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return EMPTY_ROWS
+    ends = np.cumsum(lengths)
+    return items[np.arange(total) + np.repeat(starts - (ends - lengths), lengths)]
+
+
+def _distinct(ids, size):
+    """
+    Sorted distinct values of `ids`, all in 0..size-1.
+    """
+    seen = np.zeros(size, dtype=bool)
+    seen[ids] = True
+    return np.flatnonzero(seen)
+
+
+def _group(keys, items, groups, items_sorted=False):
+    """
+    CSR layout of the distinct (key, item) pairs grouped by key in 0..groups-1: (offsets, items).
+
+    Items are ascending within each group; pass `items_sorted` when `items` already is
+    ascending overall, so a stable sort on the keys alone keeps that order.
+    """
+    order = np.argsort(keys, kind='stable') if items_sorted else np.lexsort((items, keys))
+    keys = keys[order]
+    items = items[order]
+    distinct = np.ones(len(keys), dtype=bool)
+    distinct[1:] = (keys[1:] != keys[:-1]) | (items[1:] != items[:-1])
+    keys = keys[distinct]
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(keys, minlength=groups)))).astype(np.int64)
+    return offsets, items[distinct].astype(np.int64)
+
+
+class TextIndex:
+    """
+    Case-insensitive substring lookup over a text or categorical column.
+
+    Distinct values are tokenized into runs of letters and digits; each token
+    lists the values containing it, and an n-gram index over the token
+    vocabulary finds the tokens that contain a query fragment. A query's
+    candidate values are those holding every fragment, and only those are
+    checked with a real substring test. Results are sorted row positions, as
+    `str.contains` with `case=False` would select them.
+
+    Strings are lowered, tokenized and sliced into n-grams with Arrow compute
+    functions, postings are flat arrays with offsets, and candidates are
+    gathered and checked in bulk, so near-unique columns such as free-text
+    notes are indexed and queried without per-value Python work.
+    """
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(values)
+        uniques = np.asarray(uniques, dtype=object)
+        # Non-string entries never match, as with the `.str` accessor.
+        is_text = np.fromiter((isinstance(value, str) for value in uniques), dtype=bool, count=len(uniques))
+        self.values = _lower(pa.array(np.where(is_text, uniques, None), type=pa.large_string()))
+        # Rows grouped by value: rows of value v are row_order[offsets[v]:offsets[v + 1]].
+        present = codes >= 0
+        self.offsets, self.row_order = _group(codes[present].astype(np.int64), np.flatnonzero(present),
+                                              len(uniques), items_sorted=True)
+
+        parents, tokens = _tokenize(self.values)
+        encoded = pc.dictionary_encode(tokens)
+        self.vocabulary = encoded.dictionary
+        self.token_offsets, self.token_values = _group(encoded.indices.to_numpy().astype(np.int64), parents,
+                                                       len(self.vocabulary), items_sorted=True)
+
+        # Every n-gram of every token, sliced one start position at a time.
+        lengths = pc.utf8_length(self.vocabulary).to_numpy()
+        grams = []
+        gram_tokens = []
+        for position in range(int(lengths.max(initial=0)) - NGRAM + 1):
+            ids = np.flatnonzero(lengths >= position + NGRAM)
+            grams.append(pc.utf8_slice_codeunits(self.vocabulary.take(pa.array(ids)), position, position + NGRAM))
+            gram_tokens.append(ids)
+        encoded = pc.dictionary_encode(pa.concat_arrays(grams) if grams else pa.array([], pa.large_string()))
+        self.grams = {gram: i for i, gram in enumerate(encoded.dictionary.to_pylist())}
+        self.gram_offsets, self.gram_tokens = _group(
+            encoded.indices.to_numpy().astype(np.int64),
+            np.concatenate(gram_tokens) if gram_tokens else EMPTY_ROWS, len(self.grams))
+
+    @property
+    def nbytes(self):
+        arrays = [self.offsets, self.row_order, self.token_offsets, self.token_values,
+                  self.gram_offsets, self.gram_tokens]
+        return sum(array.nbytes for array in arrays) + self.values.nbytes + self.vocabulary.nbytes + \
+            100 * len(self.grams)
+
+    def _tokens_containing(self, fragment):
+        if len(fragment) >= NGRAM:
+            gram_ids = [self.grams.get(gram) for gram in _ngrams(fragment)]
+            if None in gram_ids:
+                return EMPTY_ROWS
+            candidates = intersect(*[self.gram_tokens[self.gram_offsets[g]:self.gram_offsets[g + 1]]
+                                     for g in gram_ids])
+        else:
+            candidates = np.arange(len(self.vocabulary))
+        if len(candidates) == 0:
+            return EMPTY_ROWS
+        matches = pc.match_substring(self.vocabulary.take(pa.array(candidates)), fragment)
+        return candidates[matches.to_numpy(zero_copy_only=False)]
+
+    def _values_containing(self, query):
+        query = _lower(pa.array([query], type=pa.large_string()))
+        _, fragments = _tokenize(query)
+        query = query[0].as_py()
+        postings = []
+        for fragment in set(fragments.to_pylist()):
+            token_ids = self._tokens_containing(fragment)
+            if len(token_ids) == 0:
+                return EMPTY_ROWS
+            postings.append((self._count_postings(token_ids), token_ids))
+        candidates = None
+        for size, token_ids in sorted(postings, key=lambda posting: posting[0]):
+            if candidates is not None and size > POSTINGS_SKIP_FACTOR * len(candidates):
+                break  # Checking the remaining candidates is cheaper than gathering this fragment's values.
+            values = _distinct(_gather(self.token_offsets, self.token_values, token_ids), len(self.values))
+            candidates = values if candidates is None else intersect(candidates, values)
+        if candidates is None:
+            candidates = np.arange(len(self.values))
+        if len(candidates) == 0:
+            return EMPTY_ROWS
+        matches = pc.fill_null(pc.match_substring(self.values.take(pa.array(candidates)), query), False)
+        return candidates[matches.to_numpy(zero_copy_only=False)]
+
+    def _count_postings(self, token_ids):
+        return int((self.token_offsets[token_ids + 1] - self.token_offsets[token_ids]).sum())
+
+    def _values_equal(self, value):
+        value = _lower(pa.array([value], type=pa.large_string()))[0]
+        return np.flatnonzero(pc.fill_null(pc.equal(self.values, value), False).to_numpy(zero_copy_only=False))
+
+    def _count(self, value_ids):
+        value_ids = np.asarray(value_ids, dtype=np.int64)
+        return int((self.offsets[value_ids + 1] - self.offsets[value_ids]).sum())
+
+    def _rows_for_values(self, value_ids):
+        rows = _gather(self.offsets, self.row_order, value_ids)
+        rows.sort()
+        return rows
+
+    def contains(self, query):
+        """
+        Sorted positions of the rows whose value contains `query`, ignoring case.
+        """
+        return self._rows_for_values(self._values_containing(query))
+
+    def count_contains(self, query):
+        return self._count(self._values_containing(query))
+
+    def equal(self, value):
+        """
+        Sorted positions of the rows whose value equals `value`, ignoring case.
+        """
+        return self._rows_for_values(self._values_equal(value))
+
+    def count_equal(self, value):
+        return self._count(self._values_equal(value))
+
+    def search(self, query):
+        """
+        Rows matching a Quick Search query, or None when the query needs the regex scan.
+        """
+        if REGEX_CHARACTERS & set(query):
+            return None
+        return self.contains(query)
+
+
+class SortedIndex:
+    """
+    Equality and range lookup over a numeric or datetime column through one sorted copy of it.
+    """
+
+    def __init__(self, values):
+        self.is_datetime = pd.api.types.is_datetime64_any_dtype(values)
+        keys, valid = self._keys(values)
+        self.row_order = np.flatnonzero(valid)[np.argsort(keys[valid], kind='stable')].astype(np.int64)
+        self.sorted_keys = keys[self.row_order]
+
+    def _keys(self, values):
+        series = pd.Series(values)
+        if self.is_datetime:
+            # Nanoseconds since the epoch, kept as integers so equality stays exact.
+            if series.dt.tz is not None:
+                series = series.dt.tz_localize(None)
+            valid = series.notna().to_numpy()
+            return series.to_numpy(dtype='datetime64[ns]').astype(np.int64), valid
+        keys = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        return keys, ~np.isnan(keys)
+
+    def key(self, value):
+        if self.is_datetime:
+            value = pd.Timestamp(value)
+            if value.tz is not None:
+                value = value.tz_localize(None)  # Keys hold the column's wall-clock times.
+            return value.as_unit('ns').value
+        return float(value)
+
+    @property
+    def nbytes(self):
+        return self.row_order.nbytes + self.sorted_keys.nbytes
+
+    def _bounds(self, lower, upper, lower_inclusive, upper_inclusive):
+        start = 0
+        end = len(self.sorted_keys)
+        if lower is not None:
+            start = np.searchsorted(self.sorted_keys, self.key(lower), side='left' if lower_inclusive else 'right')
+        if upper is not None:
+            end = np.searchsorted(self.sorted_keys, self.key(upper), side='right' if upper_inclusive else 'left')
+        return int(start), int(end)
+
+    def count(self, lower=None, upper=None, lower_inclusive=True, upper_inclusive=True):
+        """
+        Number of rows `range` would return, without materializing them.
+        """
+        start, end = self._bounds(lower, upper, lower_inclusive, upper_inclusive)
+        return max(end - start, 0)
+
+    def range(self, lower=None, upper=None, lower_inclusive=True, upper_inclusive=True):
+        """
+        Sorted positions of the rows with `lower` <= value <= `upper` (bounds optional).
+        """
+        start, end = self._bounds(lower, upper, lower_inclusive, upper_inclusive)
+        if start >= end:
+            return EMPTY_ROWS
+        rows = self.row_order[start:end].copy()
+        rows.sort()
+        return rows
+
+    def equal(self, value):
+        return self.range(value, value)
+
+    def search(self, query):
+        """
+        Rows equal to a Quick Search query; an unparsable query matches nothing.
+        """
+        try:
+            return self.equal(pd.to_datetime(query) if self.is_datetime else query)
+        except (ValueError, TypeError):
+            return EMPTY_ROWS
+
+
+def build_column_index(values):
+    """
+    Index for one column, or None when its type is not indexed.
+    """
+    dtype = values.dtype
+    if dtype == object or pd.api.types.is_string_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return TextIndex(values)
+    if pd.api.types.is_datetime64_any_dtype(dtype) or (
+            pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)):
+        return SortedIndex(values)
+    return None
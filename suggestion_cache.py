@@ -0,0 +1,172 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+SUGGESTION_CACHE_DB = "suggestion_cache.db"
+# Entries older than this are never served; the least recently used are evicted past MAX_ENTRIES.
+CACHE_TTL_SECONDS = 7 * 24 * 3600
+CACHE_MAX_ENTRIES = 2000
+# Minimum cosine similarity between two challenges for the semantic tier to reuse an answer.
+SEMANTIC_THRESHOLD = 0.92
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS suggestion_cache (
+    key TEXT PRIMARY KEY,
+    context_key TEXT NOT NULL,
+    challenge TEXT NOT NULL,
+    embedding BLOB,
+    suggestions TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS suggestion_cache_context ON suggestion_cache (context_key, created_at);
+CREATE INDEX IF NOT EXISTS suggestion_cache_last_used ON suggestion_cache (last_used);
+"""
+
+
+def normalize_text(text):
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SuggestionCache:
+    """
+    Two-level cache for generated suggestions, persisted in SQLite.
+
+    The exact tier is keyed on the normalized challenge plus a hash of the
+    rest of the prompt (feedback examples and dataset context). The semantic
+    tier reuses an answer for the same prompt context when the new
+    challenge's embedding is within `semantic_threshold` cosine similarity
+    of a cached one. Entries expire after `ttl` seconds, and the least
+    recently used are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, path=SUGGESTION_CACHE_DB, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES,
+                 semantic_threshold=SEMANTIC_THRESHOLD, embed=None):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.semantic_threshold = semantic_threshold
+        # Callable mapping a challenge to a 1-D embedding; None disables the semantic tier.
+        self.embed = embed
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    @staticmethod
+    def keys(challenge, prompt_context):
+        context_key = hash_text(prompt_context)
+        return hash_text(f"{normalize_text(challenge)}\0{context_key}"), context_key
+
+    def _embedding(self, challenge):
+        if self.embed is None:
+            return None
+        try:
+            embedding = np.asarray(self.embed(challenge), dtype=np.float32).ravel()
+        except Exception as e:
+            print(f"Semantic cache disabled for this request: {str(e)}")
+            return None
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else None
+
+    def get(self, challenge, prompt_context):
+        """
+        Return (suggestions, tier, embedding); suggestions and tier are None on a miss.
+
+        `embedding` is the challenge's embedding computed for the semantic tier
+        (None if the exact tier answered or the semantic tier is off); pass it on
+        to `put` so a miss does not embed the challenge twice.
+        """
+        key, context_key = self.keys(challenge, prompt_context)
+        now = time.time()
+        oldest = now - self.ttl
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key, suggestions FROM suggestion_cache WHERE key = ? AND created_at >= ?", (key, oldest)
+            ).fetchone()
+            tier = "exact" if row else None
+
+        embedding = None
+        if row is None:
+            embedding = self._embedding(challenge)
+            if embedding is not None:
+                with self._lock:
+                    candidates = self._conn.execute(
+                        "SELECT key, suggestions, embedding FROM suggestion_cache "
+                        "WHERE context_key = ? AND created_at >= ? AND embedding IS NOT NULL",
+                        (context_key, oldest),
+                    ).fetchall()
+                if candidates:
+                    matrix = np.vstack([np.frombuffer(c[2], dtype=np.float32) for c in candidates])
+                    similarities = matrix @ embedding
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.semantic_threshold:
+                        row, tier = candidates[best][:2], "semantic"
+
+        with self._lock:
+            if row is None:
+                self.counters["misses"] += 1
+                return None, None, embedding
+            self.counters[f"{tier}_hits"] += 1
+            self._conn.execute("UPDATE suggestion_cache SET last_used = ? WHERE key = ?", (now, row[0]))
+        return json.loads(row[1]), tier, embedding
+
+    def put(self, challenge, prompt_context, suggestions, embedding=None):
+        """
+        Cache `suggestions`, reusing the `embedding` returned by `get` when there is one.
+        """
+        key, context_key = self.keys(challenge, prompt_context)
+        if embedding is None:
+            embedding = self._embedding(challenge)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO suggestion_cache "
+                "(key, context_key, challenge, embedding, suggestions, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, context_key, challenge, None if embedding is None else embedding.tobytes(),
+                 json.dumps(suggestions), now, now),
+            )
+            self._conn.execute("DELETE FROM suggestion_cache WHERE created_at < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM suggestion_cache WHERE key IN ("
+                "SELECT key FROM suggestion_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = sum(counters.values())
+        counters["lookups"] = lookups
+        counters["hit_ratio"] = (counters["exact_hits"] + counters["semantic_hits"]) / lookups if lookups else None
+        counters["exact_hit_ratio"] = counters["exact_hits"] / lookups if lookups else None
+        counters["semantic_hit_ratio"] = counters["semantic_hits"] / lookups if lookups else None
+        return counters
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_suggestion_cache():
+    """
+    Process-wide suggestion cache, using the shared sentence embedding model for the semantic tier.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                import dataset_utils
+                _cache = SuggestionCache(embed=lambda text: dataset_utils.embed_query(text)[0])
+    return _cache
@@ -0,0 +1,241 @@
+import asyncio
+import concurrent.futures
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+from openai import (
+    APIConnectionError,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    InternalServerError,
+    RateLimitError,
+)
+
+import openai_utils
+import suggestion_cache
+
+# Upstream requests allowed in flight at once; also sizes the connection pool.
+MAX_CONCURRENT_REQUESTS = 8
+REQUEST_TIMEOUT = 30.0
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+# APITimeoutError is a subclass of APIConnectionError.
+RETRYABLE_ERRORS = (APIConnectionError, RateLimitError, InternalServerError, asyncio.TimeoutError)
+
+
+def _retry_after(error):
+    """
+    Seconds the server asked us to wait in a 429 response, or 0 when it did not say.
+    """
+    try:
+        return float(error.response.headers.get("retry-after", 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+
+
+class SuggestionStream:
+    """
+    Suggestions of one streamed request as they arrive.
+
+    `suggestions` grows while the model is still writing; `future` resolves to the
+    final parsed list (or the error). Safe to read from any thread.
+    """
+
+    def __init__(self):
+        self.suggestions = []
+        self.future = concurrent.futures.Future()
+        self.started_at = time.perf_counter()
+        self.first_suggestion_at = None
+
+    def emit(self, suggestion):
+        if self.first_suggestion_at is None:
+            self.first_suggestion_at = time.perf_counter()
+        self.suggestions.append(suggestion)
+
+    @property
+    def time_to_first_suggestion(self):
+        if self.first_suggestion_at is None:
+            return None
+        return self.first_suggestion_at - self.started_at
+
+
+class SuggestionService:
+    """
+    Generates suggestions on a background asyncio loop so callers never block on the model.
+
+    All requests share one pooled `AsyncOpenAI` client. At most `max_concurrency`
+    upstream calls run at once, each bounded by `timeout` and retried with
+    exponential backoff on connection errors, rate limits and 5xx responses.
+    Concurrent requests for the same challenge and prompt context share a single
+    upstream call, and answers go through the suggestion cache.
+    """
+
+    def __init__(self, api_key=None, base_url=None, max_concurrency=MAX_CONCURRENT_REQUESTS,
+                 timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES, cache=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.cache = cache if cache is not None else suggestion_cache.get_suggestion_cache()
+        self.counters = {"requests": 0, "coalesced": 0, "upstream_calls": 0, "retries": 0,
+                         "rate_limited": 0, "failures": 0}
+        self.client = AsyncOpenAI(
+            api_key=api_key or openai_utils.OPENAI_API_KEY,
+            base_url=base_url,
+            timeout=timeout,
+            max_retries=0,  # Retries are handled here so they respect the concurrency limit.
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+            ),
+        )
+        # Seconds from request to first rendered suggestion, for the most recent streamed requests.
+        self.first_suggestion_latencies = deque(maxlen=1000)
+        self._inflight = {}
+        self._streams = {}
+        self._resume_at = 0.0
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._thread = threading.Thread(target=self._loop.run_forever, name="suggestion-service", daemon=True)
+        self._thread.start()
+
+    def submit(self, challenge, context=None):
+        """
+        Queue a suggestion request and return a concurrent.futures.Future for the suggestion list.
+        """
+        prompt, prompt_context = openai_utils.build_prompt(challenge, context)
+        return asyncio.run_coroutine_threadsafe(self._suggest(challenge, prompt, prompt_context), self._loop)
+
+    def submit_stream(self, challenge, context=None):
+        """
+        Queue a streamed suggestion request and return its SuggestionStream.
+        """
+        prompt, prompt_context = openai_utils.build_prompt(challenge, context)
+        return asyncio.run_coroutine_threadsafe(
+            self._open_stream(challenge, prompt, prompt_context), self._loop
+        ).result()
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.client.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    async def _suggest(self, challenge, prompt, prompt_context):
+        self.counters["requests"] += 1
+        key, _ = suggestion_cache.SuggestionCache.keys(challenge, prompt_context)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._resolve(challenge, prompt, prompt_context))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.counters["coalesced"] += 1
+        # Shield so one caller giving up does not cancel the call others are waiting on.
+        return await asyncio.shield(task)
+
+    async def _resolve(self, challenge, prompt, prompt_context):
+        loop = asyncio.get_running_loop()
+        cached, tier, embedding = await loop.run_in_executor(None, self.cache.get, challenge, prompt_context)
+        if cached is not None:
+            return cached
+        suggestions = await self._request(prompt)
+        await loop.run_in_executor(None, self.cache.put, challenge, prompt_context, suggestions, embedding)
+        return suggestions
+
+    async def _open_stream(self, challenge, prompt, prompt_context):
+        self.counters["requests"] += 1
+        key, _ = suggestion_cache.SuggestionCache.keys(challenge, prompt_context)
+        stream = self._streams.get(key)
+        if stream is not None:
+            self.counters["coalesced"] += 1
+            return stream
+        stream = SuggestionStream()
+        self._streams[key] = stream
+        task = asyncio.ensure_future(self._fill_stream(stream, challenge, prompt, prompt_context))
+        task.add_done_callback(lambda _: self._streams.pop(key, None))
+        return stream
+
+    async def _fill_stream(self, stream, challenge, prompt, prompt_context):
+        loop = asyncio.get_running_loop()
+        try:
+            cached, tier, embedding = await loop.run_in_executor(None, self.cache.get, challenge, prompt_context)
+            if cached is not None:
+                for suggestion in cached:
+                    stream.emit(suggestion)
+                suggestions = cached
+            else:
+                suggestions = await self._request(prompt, stream)
+                await loop.run_in_executor(None, self.cache.put, challenge, prompt_context, suggestions, embedding)
+        except Exception as e:
+            stream.future.set_exception(e)
+            return
+        if stream.time_to_first_suggestion is not None:
+            self.first_suggestion_latencies.append(stream.time_to_first_suggestion)
+            print(f"Time to first suggestion: {stream.time_to_first_suggestion * 1000:.0f} ms "
+                  f"(total {(time.perf_counter() - stream.started_at) * 1000:.0f} ms)")
+        stream.future.set_result(suggestions)
+
+    async def _consume_stream(self, prompt, stream):
+        parser = openai_utils.SuggestionStreamParser()
+        response = await self.client.chat.completions.create(**openai_utils.chat_request(prompt), stream=True)
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                for suggestion in parser.feed(chunk.choices[0].delta.content):
+                    stream.emit(suggestion)
+        return parser.buffer
+
+    async def _request(self, prompt, stream=None):
+        """
+        Call the model with retries; with a `stream`, suggestions are emitted into it as they complete.
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    # After a 429 every request holds off until the server's retry window has passed.
+                    pause = self._resume_at - loop.time()
+                    if pause > 0:
+                        await asyncio.sleep(pause)
+                    self.counters["upstream_calls"] += 1
+                    async with asyncio.timeout(self.timeout):
+                        if stream is None:
+                            response = await self.client.chat.completions.create(**openai_utils.chat_request(prompt))
+                            content = response.choices[0].message.content
+                        else:
+                            content = await self._consume_stream(prompt, stream)
+                return openai_utils.parse_suggestions(content)
+            except RETRYABLE_ERRORS as e:
+                # Suggestions already shown to the user cannot be retracted by a retry.
+                if attempt == self.max_retries or (stream is not None and stream.suggestions):
+                    self.counters["failures"] += 1
+                    raise
+                self.counters["retries"] += 1
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+                if isinstance(e, RateLimitError):
+                    self.counters["rate_limited"] += 1
+                    delay = max(delay, _retry_after(e))
+                    self._resume_at = max(self._resume_at, loop.time() + delay)
+                print(f"Suggestion request failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            except Exception:
+                self.counters["failures"] += 1
+                raise
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_suggestion_service():
+    """
+    Process-wide suggestion service shared by every session, or None without an API key.
+    """
+    global _service
+    if not openai_utils.OPENAI_API_KEY:
+        return None
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = SuggestionService()
+    return _service